@@ -18,7 +18,6 @@ from services.export_service import ExportService, TemplateManager
 
 # Import UI components
 from ui.main_window import create_main_window
-from ui.styles import apply_theme
 
 
 def setup_logging():
@@ -84,9 +83,6 @@ def main():
         export_service=export_service
     )
     
-    # Apply theme
-    apply_theme(window)
-    
     window.show()
     
     # Start event loop
@@ -1,18 +1,52 @@
 import sys
-import pandas as pd
-import requests
+import importlib.util
 import json
+import orjson
 import re
 import io
 import time
+import html
+import hashlib
+import threading
+from collections import OrderedDict
+from diskcache import Cache
 from datetime import datetime
+from pathlib import Path
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                            QLabel, QLineEdit, QPushButton, QTextEdit, QTableView, 
+                            QLabel, QLineEdit, QPushButton, QTextEdit, QPlainTextEdit, QTableView, 
                             QHeaderView, QFileDialog, QTabWidget, QSplitter, QMessageBox,
-                            QGroupBox)
-from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+                            QGroupBox, QSpinBox, QComboBox)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QTextCursor
 
+# Heavy modules are imported on first use so the window can show sooner
+pd = None
+requests = None
+
+def _pd():
+    """Return the pandas module, importing it on first use"""
+    global pd
+    if pd is None:
+        import pandas
+        pd = pandas
+    return pd
+
+def _requests():
+    """Return the requests module, importing it on first use"""
+    global requests
+    if requests is None:
+        import requests as requests_module
+        requests = requests_module
+    return requests
+
+def _warm_imports():
+    """Import the heavy modules once the window is up, before the first request"""
+    _pd()
+    _requests()
+
+# Optional fast CSV writer (checked without importing it)
+PYARROW_SUPPORT = importlib.util.find_spec("pyarrow") is not None
+
 # Core commands for spring testing with detailed descriptions
 COMMANDS = {
     "ZF": "Zero Force", 
@@ -35,6 +69,10 @@ COMMANDS = {
     "PUi": "User Input"
 }
 
+# Command reference table columns, built once at import
+COMMAND_HEADERS = ("Command", "Description")
+COMMAND_COLUMNS = (tuple(COMMANDS), tuple(COMMANDS.values()))
+
 # Standard speed values for different command types
 STANDARD_SPEEDS = {
     "ZF": "50",         # Zero Force - slow speed for accuracy
@@ -54,29 +92,186 @@ STANDARD_SPEEDS = {
     "default": "100"    # Default moderate speed
 }
 
+# Enhanced parameter extraction patterns, compiled once at import
+PARAMETER_PATTERNS = {
+    "Free Length": r'free\s*length\s*(?:[=:]|is|of)?\s*(\d+\.?\d*)\s*(?:mm)?',
+    "Part Number": r'part\s*(?:number|#|no\.?)?\s*(?:[=:]|is)?\s*([A-Za-z0-9-_]+)',
+    "Model Number": r'model\s*(?:number|#|no\.?)?\s*(?:[=:]|is)?\s*([A-Za-z0-9-_]+)',
+    "Wire Diameter": r'wire\s*(?:diameter|thickness)?\s*(?:[=:]|is)?\s*(\d+\.?\d*)\s*(?:mm)?',
+    "Outer Diameter": r'(?:outer|outside)\s*diameter\s*(?:[=:]|is)?\s*(\d+\.?\d*)\s*(?:mm)?',
+    "Inner Diameter": r'(?:inner|inside)\s*diameter\s*(?:[=:]|is)?\s*(\d+\.?\d*)\s*(?:mm)?',
+    "Spring Rate": r'(?:spring|target)\s*rate\s*(?:[=:]|is)?\s*(\d+\.?\d*)',
+    "Test Load": r'(?:test|target)\s*load\s*(?:[=:]|is)?\s*(\d+\.?\d*)',
+    "Deflection": r'deflection\s*(?:[=:]|is)?\s*(\d+\.?\d*)',
+    "Working Length": r'working\s*length\s*(?:[=:]|is)?\s*(\d+\.?\d*)',
+    "Customer ID": r'customer\s*(?:id|number)?\s*(?:[=:]|is)?\s*([A-Za-z0-9\s]+)',
+}
+STRING_PARAMETERS = ("Part Number", "Model Number", "Customer ID")
+
+# All patterns fused into one alternation so the text is scanned once. Each
+# alternative sits in a lookahead, so overlapping fields (e.g. a greedy Customer ID)
+# still match independently, exactly as separate searches would.
+_GROUP_NAMES = {name: name.replace(" ", "_") for name in PARAMETER_PATTERNS}
+_PARAMETER_SCAN = re.compile(
+    "|".join(
+        "(?=" + re.sub(r'\((?!\?)', f"(?P<{_GROUP_NAMES[name]}>", pattern, count=1) + ")"
+        for name, pattern in PARAMETER_PATTERNS.items()
+    )
+    + r'|(?=\b(?P<Compression>compress|compression)\b)'
+    + r'|(?=\b(?P<Tension>tens|tension|extension|extend)\b)',
+    re.IGNORECASE
+)
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns of a generated sequence, in display order
+SEQUENCE_COLUMNS = ["Row", "CMD", "Description", "Condition", "Unit", "Tolerance", "Speed rpm"]
+
+# Shared decoder for pulling the JSON payload out of model replies
+_JSON_DECODER = json.JSONDecoder()
+
+# Enhanced system prompt with more precise industry specifications. Kept as one
+# invariant string at the head of every request so provider-side prefix caching
+# can reuse it; anything that varies per call goes at the very end.
+SYSTEM_PROMPT = """\
+You are an expert AI in spring force testing systems. Generate test sequences exactly matching this format:
+
+COMMAND SEQUENCE:
+1. Initial Setup:
+   - ZF: Tare force (no condition needed)
+   - TH: Threshold at 5N exactly
+   - FL(P): Free length measurement with tolerance (e.g., 120(119,121))
+
+2. Position Setup:
+   - Mv(P): Move to calculated position =(FreeLength-24.3)
+   - Mv(P): Home position (absolute value)
+
+3. Conditioning:
+   - Scrag: Format "R03,2" for 2 cycles
+   - TH: Search contact at 5N
+   - FL(P): Verify free length
+
+4. Test Points:
+   - Mv(P): L1 position =(R07-14.3)
+   - Fr(P): F1 measurement with tolerance
+   - TD: 3 second delay
+   - Mv(P): L2 position =(R07-24.3)
+
+EXACT FORMAT RULES:
+1. Conditions:
+   - TH: Always use 5N
+   - Mv(P): Use formulas like =(R02-24.3)
+   - Scrag: Use format R03,2
+   - TD: Use exact seconds (3)
+
+2. Units:
+   - Force: N
+   - Position: mm
+   - Time: Sec
+
+3. Tolerances:
+   - Length: nominal(min,max) e.g., 120(119,121)
+   - Force: nominal(min,max) e.g., 2799(2659,2939)
+
+4. Speeds:
+   - TH: 50 rpm
+   - FL(P): 100 rpm
+   - Mv(P): 200 rpm for home, 100 rpm for test
+   - Fr(P): 100 rpm
+
+OUTPUT FORMAT:
+Return JSON array with:
+- Row: "R00", "R01", etc.
+- CMD: Exact command from list
+- Description: Match example descriptions
+- Condition: Exact formula or value
+- Unit: N, mm, or Sec only
+- Tolerance: nominal(min,max) format
+- Speed rpm: Match example speeds
+"""
+
+# Enhanced user prompt with simpler, command-focused requirements. The static
+# rules come first and the spring parameters last to lengthen the shared prefix.
+USER_PROMPT_TEMPLATE = """\
+Generate a spring test sequence using these commands in order:
+1. Setup: ZF, ZD, TH
+2. Initial Check: FL(P)
+3. Conditioning: Scrag, TD (2 seconds)
+4. Main Test: Mv(P), Fr(P), SR
+5. Final Check: FL(P), PMsg
+
+Rules:
+- Start with zeroing (ZF, ZD)
+- Use TH at 10N for contact
+- Include 3 Scrag cycles
+- Use proper speeds:
+  * 50 rpm for zeroing
+  * 100 rpm for measurements
+  * 200 rpm for movement
+  * 300 rpm for scragging
+- Add 2-second TD after movements
+- End with final length check
+
+Return a JSON array with Row, CMD, Description, Condition, Unit, Tolerance, and Speed rpm.
+
+Spring Parameters:
+{parameter_text}"""
+
+# Upper bound for the "variants" spinbox; each variant adds output tokens to one call
+MAX_VARIANTS = 5
+
+# Maximum number of blocks kept in the chat log
+CHAT_MAX_BLOCKS = 2000
+
+# (connect, read) timeouts in seconds for API calls
+API_TIMEOUT = (3.0, 60)
+
+# Milliseconds to wait for each worker thread when the window closes
+WORKER_SHUTDOWN_WAIT = 2000
+
+# Maximum number of API responses kept in the exact-match cache
+RESPONSE_CACHE_SIZE = 128
+
+# Maximum number of sequences kept in the parameter cache
+PARAMETER_CACHE_SIZE = 500
+
+# Persistent parameter -> sequence cache shared across sessions
+SEQUENCE_CACHE_DIR = Path.home() / ".spring_test" / "seqcache"
+SEQUENCE_CACHE_EXPIRE = 30 * 24 * 3600  # seconds
+
 class PandasModel(QAbstractTableModel):
     """Model for displaying pandas DataFrame in QTableView"""
     def __init__(self, data):
         super().__init__()
         self._data = data
+        # Stringify every cell once; Qt asks for the same cell many times per repaint
+        self._strs = data.astype(str).values.tolist()
+        self._columns = list(data.columns)
 
     def rowCount(self, parent=None):
-        return self._data.shape[0]
+        return len(self._strs)
 
     def columnCount(self, parent=None):
-        return self._data.shape[1]
+        return len(self._columns)
+
+    def append_row(self, values):
+        """Append one row of display strings (used while a response streams in)"""
+        row = len(self._strs)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._strs.append(values)
+        self.endInsertRows()
 
     def data(self, index, role=Qt.DisplayRole):
         if index.isValid():
             if role == Qt.DisplayRole:
-                return str(self._data.iloc[index.row(), index.column()])
+                return self._strs[index.row()][index.column()]
             if role == Qt.TextAlignmentRole:
                 return Qt.AlignCenter
         return None
 
     def headerData(self, section, orientation, role):
         if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            return self._data.columns[section]
+            return self._columns[section]
         if orientation == Qt.Vertical and role == Qt.DisplayRole:
             return str(section + 1)
         return None
@@ -85,11 +280,15 @@ class CommandTableModel(QAbstractTableModel):
     """Model for displaying command reference"""
     def __init__(self, commands):
         super().__init__()
-        self.commands = [(k, v) for k, v in commands.items()]
-        self.headers = ["Command", "Description"]
+        # Column-wise storage: one tuple per column, indexed by row
+        if commands is COMMANDS:
+            self._columns = COMMAND_COLUMNS
+        else:
+            self._columns = (tuple(commands), tuple(commands.values()))
+        self.headers = COMMAND_HEADERS
 
     def rowCount(self, parent=None):
-        return len(self.commands)
+        return len(self._columns[0])
 
     def columnCount(self, parent=None):
         return len(self.headers)
@@ -97,7 +296,7 @@ class CommandTableModel(QAbstractTableModel):
     def data(self, index, role=Qt.DisplayRole):
         if index.isValid():
             if role == Qt.DisplayRole:
-                return self.commands[index.row()][index.column()]
+                return self._columns[index.column()][index.row()]
             if role == Qt.TextAlignmentRole:
                 return Qt.AlignCenter
         return None
@@ -112,6 +311,94 @@ class ChatMessage:
         self.role = role
         self.content = content
 
+class StreamRowParser:
+    """Incrementally pull complete row objects out of a streamed JSON array"""
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        """Consume a chunk of text and return the rows it completed"""
+        rows = []
+        for ch in text:
+            if not self._depth:
+                # Skip prose, fences and the enclosing array until a row opens
+                if ch == "{":
+                    self._depth = 1
+                    self._buffer = [ch]
+                continue
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if not self._depth:
+                    try:
+                        row = json.loads("".join(self._buffer))
+                    except ValueError:
+                        row = None
+                    if isinstance(row, dict):
+                        rows.append(row)
+        return rows
+
+class RequestCancelled(Exception):
+    """Raised inside a worker when its request has been superseded"""
+
+class ApiWorker(QThread):
+    """Worker thread that runs the API call off the GUI thread"""
+    finished_sequences = pyqtSignal(object)
+    row_ready = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+    def __init__(self, app, parameters, api_key, variants=1, request_id=0):
+        super().__init__()
+        self.app = app
+        self.parameters = parameters
+        self.api_key = api_key
+        self.variants = variants
+        self.request_id = request_id
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Ask the worker to abandon its request as soon as possible"""
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            if self.variants > 1:
+                # All variants come back from a single round-trip
+                sequences = self.app.call_api_batch(
+                    [self.parameters] * self.variants, self.api_key, cancel=self._cancel)
+            else:
+                # Stream rows to the table while the reply is still arriving
+                df = self.app.call_api(self.parameters, self.api_key,
+                                       on_row=self.row_ready.emit, cancel=self._cancel)
+                # A request cancelled by Clear Chat must not repopulate the caches
+                if not self.is_cancelled():
+                    self.app.remember_sequence(self.parameters, df)
+                sequences = [df]
+            if not self.is_cancelled():
+                self.finished_sequences.emit(sequences)
+        except RequestCancelled:
+            pass
+        except Exception as e:
+            if not self.is_cancelled():
+                self.error.emit(str(e))
+
 class SpringTestApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -121,8 +408,27 @@ class SpringTestApp(QMainWindow):
         # Initialize variables similar to session state
         self.chat_history = []
         self.current_sequence = None
-        self.chat_memory = []
+        self.sequence_variants = []
         self.last_raw_response = ""
+        self._active_worker = None
+        self._latest_request_id = 0
+        # Superseded workers stay referenced until their thread exits
+        self._workers = set()
+        self._streaming_model = None
+        
+        # Exact-match cache of prompt -> DataFrame (responses are near-deterministic at temperature 0.1)
+        self._response_cache = OrderedDict()
+        # Canonical parameters -> DataFrame, so paraphrased requests skip the API entirely
+        self._parameter_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Sequences also persist on disk so repeated specs are instant after a restart
+        self._disk_cache = Cache(str(SEQUENCE_CACHE_DIR))
+        
+        # Keep-alive session, created on first use by a worker thread
+        self._session = None
+        self._session_lock = threading.Lock()
+        # Streaming responses in progress, closed on exit to abort them
+        self._open_responses = set()
         
         self.initUI()
         
@@ -178,9 +484,10 @@ class SpringTestApp(QMainWindow):
         chat_label = QLabel("Spring Test Chat Assistant")
         chat_label.setFont(QFont("Arial", 12, QFont.Bold))
         
-        # Chat history display
-        self.chat_display = QTextEdit()
+        # Chat history display (plain text log with bounded memory)
+        self.chat_display = QPlainTextEdit()
         self.chat_display.setReadOnly(True)
+        self.chat_display.setMaximumBlockCount(CHAT_MAX_BLOCKS)
         
         # User input
         input_label = QLabel("Enter your request:")
@@ -188,16 +495,25 @@ class SpringTestApp(QMainWindow):
         self.user_input.setPlaceholderText("Example: Generate a test sequence for a compression spring with free length 50mm, wire diameter 2mm, and spring rate 5 N/mm.")
         self.user_input.setMaximumHeight(150)
         
-        # Generate button
-        generate_btn = QPushButton("Generate Sequence")
-        generate_btn.clicked.connect(self.generate_sequence)
+        # Generate button with number of variants per request
+        generate_layout = QHBoxLayout()
+        variants_label = QLabel("Variants:")
+        self.variants_spin = QSpinBox()
+        self.variants_spin.setRange(1, MAX_VARIANTS)
+        self.variants_spin.setToolTip("Generate several alternative sequences in one API call")
+        self.generate_btn = QPushButton("Generate Sequence")
+        self.generate_btn.clicked.connect(self.generate_sequence)
+        
+        generate_layout.addWidget(variants_label)
+        generate_layout.addWidget(self.variants_spin)
+        generate_layout.addWidget(self.generate_btn, 1)
         
         # Add widgets to chat layout
         chat_layout.addWidget(chat_label)
         chat_layout.addWidget(self.chat_display)
         chat_layout.addWidget(input_label)
         chat_layout.addWidget(self.user_input)
-        chat_layout.addWidget(generate_btn)
+        chat_layout.addLayout(generate_layout)
         
         chat_widget.setLayout(chat_layout)
         
@@ -208,6 +524,11 @@ class SpringTestApp(QMainWindow):
         results_label = QLabel("Generated Test Sequence")
         results_label.setFont(QFont("Arial", 12, QFont.Bold))
         
+        # Variant selector (only shown when several variants were generated)
+        self.variant_combo = QComboBox()
+        self.variant_combo.currentIndexChanged.connect(self.show_variant)
+        self.variant_combo.hide()
+        
         # Results table
         self.results_table = QTableView()
         self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
@@ -227,6 +548,7 @@ class SpringTestApp(QMainWindow):
         
         # Add widgets to results layout
         results_layout.addWidget(results_label)
+        results_layout.addWidget(self.variant_combo)
         results_layout.addWidget(self.results_table)
         results_layout.addWidget(download_label)
         results_layout.addLayout(download_layout)
@@ -252,34 +574,32 @@ class SpringTestApp(QMainWindow):
     
     def clear_chat(self):
         """Clear chat history and current sequence"""
+        self.cancel_active_request()
         self.chat_history = []
         self.current_sequence = None
+        self.sequence_variants = []
+        self.variant_combo.clear()
+        self.variant_combo.hide()
+        with self._cache_lock:
+            self._response_cache.clear()
+            self._parameter_cache.clear()
+        # Sequences from earlier sessions would otherwise come back for the same spec
+        self._disk_cache.clear()
         self.chat_display.clear()
         self.results_table.setModel(None)
     
     def add_chat_message(self, role, content):
-        """Add a message to the chat history"""
-        self.chat_history.append(ChatMessage(role, content))
-        self.update_chat_display()
-    
-    def update_chat_display(self):
-        """Update the chat display with current history"""
-        self.chat_display.clear()
+        """Add a message to the chat history and render only that message"""
+        message = ChatMessage(role, content)
+        self.chat_history.append(message)
         
-        for message in self.chat_history:
-            if message.role == "user":
-                self.chat_display.append("<b>You:</b>")
-                self.chat_display.append(message.content)
-                self.chat_display.append("")
-            else:
-                self.chat_display.append("<b>Assistant:</b>")
-                self.chat_display.append(message.content)
-                self.chat_display.append("")
+        label = "You" if role == "user" else "Assistant"
+        escaped = html.escape(content).replace("\n", "<br>")
+        self.chat_display.appendHtml(f"<b>{label}:</b><br>{escaped}")
+        self.chat_display.appendPlainText("")
                 
-        # Scroll to bottom - fixed
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.chat_display.setTextCursor(cursor)
+        # Scroll to bottom once per appended message
+        self.chat_display.moveCursor(QTextCursor.End)
     
     def generate_sequence(self):
         """Generate test sequence based on user input"""
@@ -294,257 +614,457 @@ class SpringTestApp(QMainWindow):
             QMessageBox.warning(self, "Missing Input", "Please enter your request.")
             return
         
+        # A new request supersedes whatever is still in flight
+        self.cancel_active_request()
+        
         # Add user message to chat history
         self.add_chat_message("user", user_input)
         
         # Extract parameters from natural language input
         parameters = self.extract_parameters(user_input)
         
-        try:
-            # Show loading message
-            QApplication.setOverrideCursor(Qt.WaitCursor)
-            
-            # Generate test sequence
-            df = self.call_api(parameters, api_key)
+        variants = self.variants_spin.value()
+        
+        # Requests that reduce to the same spring spec reuse the earlier sequence
+        if variants == 1:
+            cached = self.lookup_sequence(parameters)
+            if cached is not None:
+                self._on_sequence_ready([cached])
+                return
+        
+        # Show busy state without blocking the event loop
+        self.set_busy(True)
+        
+        # Generate test sequence in a worker thread
+        self._latest_request_id += 1
+        worker = ApiWorker(self, parameters, api_key, variants, self._latest_request_id)
+        worker.finished_sequences.connect(self._on_sequence_ready)
+        worker.row_ready.connect(self._on_row_ready)
+        worker.error.connect(self._on_sequence_error)
+        worker.finished.connect(self._on_worker_finished)
+        self._active_worker = worker
+        self._workers.add(worker)
+        self._streaming_model = None
+        worker.start()
+    
+    def cancel_active_request(self):
+        """Cancel the in-flight request, if any, so its results are discarded"""
+        worker = self._active_worker
+        if worker is None:
+            return
+        worker.cancel()
+        self._active_worker = None
+        self._latest_request_id += 1
+        self.set_busy(False)
+    
+    def _is_stale(self):
+        """True when the signal being handled comes from a superseded worker"""
+        worker = self.sender()
+        return isinstance(worker, ApiWorker) and worker.request_id != self._latest_request_id
+    
+    @staticmethod
+    def canonical_parameters(parameters):
+        """Build a canonical key for extracted parameters, ignoring wording and timestamp"""
+        canonical = {}
+        for key, value in parameters.items():
+            if key == "Timestamp":
+                continue
+            if isinstance(value, str):
+                value = " ".join(value.split()).casefold()
+            canonical[key] = value
+        return json.dumps(canonical, sort_keys=True)
+    
+    @classmethod
+    def sequence_cache_key(cls, parameters):
+        """Short stable key for the persistent sequence cache"""
+        return hashlib.md5(cls.canonical_parameters(parameters).encode("utf-8")).hexdigest()
+    
+    def lookup_sequence(self, parameters):
+        """Return a copy of the cached sequence for equivalent parameters, or None"""
+        key = self.canonical_parameters(parameters)
+        with self._cache_lock:
+            df = self._parameter_cache.get(key)
+            if df is not None:
+                self._parameter_cache.move_to_end(key)
+                return df.copy()
+        
+        # Fall back to sequences generated in earlier sessions
+        df = self._disk_cache.get(self.sequence_cache_key(parameters))
+        if df is None:
+            return None
+        with self._cache_lock:
+            self._parameter_cache[key] = df.copy()
+            self._trim_parameter_cache()
+        return df
+    
+    def remember_sequence(self, parameters, df):
+        """Store a generated sequence under its canonical parameters"""
+        if df.empty:
+            return
+        key = self.canonical_parameters(parameters)
+        with self._cache_lock:
+            self._parameter_cache[key] = df.copy()
+            self._parameter_cache.move_to_end(key)
+            self._trim_parameter_cache()
+        self._disk_cache.set(self.sequence_cache_key(parameters), df, expire=SEQUENCE_CACHE_EXPIRE)
+    
+    def _trim_parameter_cache(self):
+        """Evict the least recently used sequences (caller holds the lock)"""
+        while len(self._parameter_cache) > PARAMETER_CACHE_SIZE:
+            self._parameter_cache.popitem(last=False)
+    
+    def get_session(self):
+        """Return the keep-alive session so later calls reuse the pooled HTTPS connection"""
+        with self._session_lock:
+            if self._session is None:
+                requests_module = _requests()
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                
+                class RateLimitRetry(Retry):
+                    # Of the Retry-After statuses only 429 guarantees the request was not processed
+                    RETRY_AFTER_STATUS_CODES = frozenset([429])
+                
+                session = requests_module.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=4,
+                    # The completion POST is paid and not idempotent, so it is only retried
+                    # when it never reached the server or was rejected as rate limited.
+                    # Neither case has sent any streamed rows yet.
+                    max_retries=RateLimitRetry(
+                        total=2,
+                        connect=2,
+                        read=0,
+                        other=0,
+                        status=2,
+                        backoff_factor=0.3,
+                        status_forcelist=[429],
+                        allowed_methods=None,
+                        respect_retry_after_header=True
+                    )
+                )
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+    
+    def closeEvent(self, event):
+        """Stop the workers, then release the HTTP session and the persistent cache on exit"""
+        self.cancel_active_request()
+        for worker in list(self._workers):
+            worker.cancel()
+        # Closing the streams and the session aborts requests in flight, so the
+        # workers exit without waiting for the read timeout
+        with self._session_lock:
+            responses = list(self._open_responses)
+        for response in responses:
+            response.close()
+        if self._session is not None:
+            self._session.close()
+        # A running QThread must not be destroyed, and workers may still write to the
+        # cache; a blocking non-streamed post can't be interrupted, so the wait is bounded
+        for worker in list(self._workers):
+            worker.wait(WORKER_SHUTDOWN_WAIT)
+        self._disk_cache.close()
+        super().closeEvent(event)
+    
+    def set_busy(self, busy):
+        """Toggle the busy indicator on the generate button"""
+        # The button stays enabled: generating again cancels the running request
+        self.generate_btn.setText("Generating..." if busy else "Generate Sequence")
+    
+    def _on_sequence_ready(self, sequences):
+        """Display the sequence(s) returned by the worker"""
+        if self._is_stale():
+            return
+        sequences = [df for df in sequences if not df.empty]
+        if sequences:
+            self.sequence_variants = sequences
             
-            QApplication.restoreOverrideCursor()
+            # Rebuild the variant selector without re-rendering the table per item
+            self.variant_combo.blockSignals(True)
+            self.variant_combo.clear()
+            self.variant_combo.addItems([f"Variant {i + 1}" for i in range(len(sequences))])
+            self.variant_combo.blockSignals(False)
+            self.variant_combo.setVisible(len(sequences) > 1)
+            self.show_variant(0)
             
-            if not df.empty:
-                self.current_sequence = df
-                # Display the sequence in the table
-                model = PandasModel(df)
-                self.results_table.setModel(model)
-                self.results_table.resizeColumnsToContents()
-                response = "I've generated a test sequence based on your specifications. You can see the results in the right panel."
+            if len(sequences) > 1:
+                response = f"I've generated {len(sequences)} test sequence variants based on your specifications. Use the selector in the right panel to compare them."
             else:
-                response = "I couldn't generate a valid test sequence. Please provide more specific spring details."
-            
-            self.add_chat_message("assistant", response)
-            
-        except Exception as e:
-            QApplication.restoreOverrideCursor()
-            QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
+                response = "I've generated a test sequence based on your specifications. You can see the results in the right panel."
+        else:
+            response = "I couldn't generate a valid test sequence. Please provide more specific spring details."
+        
+        self.add_chat_message("assistant", response)
     
-    def call_api(self, parameters, api_key):
-        """Call the API to generate test sequence"""
-        url = "https://chat01.ai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
-        # Enhanced system prompt with more precise industry specifications
-        system_prompt = """
-        You are an expert AI in spring force testing systems. Generate test sequences exactly matching this format:
-
-        COMMAND SEQUENCE:
-        1. Initial Setup:
-           - ZF: Tare force (no condition needed)
-           - TH: Threshold at 5N exactly
-           - FL(P): Free length measurement with tolerance (e.g., 120(119,121))
-           
-        2. Position Setup:
-           - Mv(P): Move to calculated position =(FreeLength-24.3)
-           - Mv(P): Home position (absolute value)
-           
-        3. Conditioning:
-           - Scrag: Format "R03,2" for 2 cycles
-           - TH: Search contact at 5N
-           - FL(P): Verify free length
-           
-        4. Test Points:
-           - Mv(P): L1 position =(R07-14.3)
-           - Fr(P): F1 measurement with tolerance
-           - TD: 3 second delay
-           - Mv(P): L2 position =(R07-24.3)
-
-        EXACT FORMAT RULES:
-        1. Conditions:
-           - TH: Always use 5N
-           - Mv(P): Use formulas like =(R02-24.3)
-           - Scrag: Use format R03,2
-           - TD: Use exact seconds (3)
-           
-        2. Units:
-           - Force: N
-           - Position: mm
-           - Time: Sec
-           
-        3. Tolerances:
-           - Length: nominal(min,max) e.g., 120(119,121)
-           - Force: nominal(min,max) e.g., 2799(2659,2939)
-           
-        4. Speeds:
-           - TH: 50 rpm
-           - FL(P): 100 rpm
-           - Mv(P): 200 rpm for home, 100 rpm for test
-           - Fr(P): 100 rpm
-
-        OUTPUT FORMAT:
-        Return JSON array with:
-        - Row: "R00", "R01", etc.
-        - CMD: Exact command from list
-        - Description: Match example descriptions
-        - Condition: Exact formula or value
-        - Unit: N, mm, or Sec only
-        - Tolerance: nominal(min,max) format
-        - Speed rpm: Match example speeds
-        """
-
-        # Format parameter text for prompt
-        parameter_text = "\n".join([f"{k}: {v}" for k, v in parameters.items()])
-        
-        # Include previous context if available
-        context = ""
-        if self.chat_memory:
-            context = "\n\nPrevious context:\n" + "\n".join(self.chat_memory[-3:])
-        
-        # Enhanced user prompt with simpler, command-focused requirements
-        user_prompt = f"""
-        Generate a spring test sequence using these commands in order:
-        1. Setup: ZF, ZD, TH
-        2. Initial Check: FL(P)
-        3. Conditioning: Scrag, TD (2 seconds)
-        4. Main Test: Mv(P), Fr(P), SR
-        5. Final Check: FL(P), PMsg
-
-        Spring Parameters:
-        {parameter_text}
-
-        Rules:
-        - Start with zeroing (ZF, ZD)
-        - Use TH at 10N for contact
-        - Include 3 Scrag cycles
-        - Use proper speeds:
-          * 50 rpm for zeroing
-          * 100 rpm for measurements
-          * 200 rpm for movement
-          * 300 rpm for scragging
-        - Add 2-second TD after movements
-        - End with final length check
-
-        Return a JSON array with Row, CMD, Description, Condition, Unit, Tolerance, and Speed rpm.
-        """
+    def show_variant(self, index):
+        """Display one of the generated sequence variants"""
+        if not 0 <= index < len(self.sequence_variants):
+            return
+        df = self.sequence_variants[index]
+        self.current_sequence = df
+        self._streaming_model = None
+        # Display the sequence in the table
+        model = PandasModel(df)
+        self.results_table.setModel(model)
+        self.results_table.resizeColumnsToContents()
+    
+    def _on_row_ready(self, row):
+        """Show a streamed row before the full sequence has arrived"""
+        if self._is_stale():
+            return
+        if self._streaming_model is None:
+            self._streaming_model = PandasModel(_pd().DataFrame(columns=SEQUENCE_COLUMNS))
+            self.results_table.setModel(self._streaming_model)
+        if "Speed" in row and "Speed rpm" not in row:
+            row["Speed rpm"] = row["Speed"]
+        self._streaming_model.append_row([
+            "" if row.get(col) is None else str(row[col]) for col in SEQUENCE_COLUMNS
+        ])
+    
+    def _on_sequence_error(self, message):
+        """Report an error raised by the worker"""
+        if self._is_stale():
+            return
+        QMessageBox.critical(self, "API Error", f"API Error: {message}")
+    
+    def _on_worker_finished(self):
+        """Reset the busy state once the worker thread has exited"""
+        worker = self.sender()
+        self._workers.discard(worker)
+        worker.deleteLater()
+        if worker is self._active_worker:
+            self._active_worker = None
+            self.set_busy(False)
+    
+    def call_api(self, parameters, api_key, cache=True, on_row=None, cancel=None):
+        """Call the API to generate test sequence (runs in an ApiWorker thread)"""
+        # Format parameter text for prompt (the timestamp would make every prompt unique)
+        parameter_text = "\n".join([f"{k}: {v}" for k, v in parameters.items() if k != "Timestamp"])
+        
+        user_prompt = USER_PROMPT_TEMPLATE.format(parameter_text=parameter_text).rstrip()
 
         payload = {
             "model": "gpt-4o",
             "messages": [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
             "temperature": 0.1  # Lower temperature for more consistent output
         }
 
-        try:
-            response = requests.post(url, headers=headers, json=payload)
+        # Identical prompts are answered from the cache
+        cache_key = hashlib.sha256((SYSTEM_PROMPT + user_prompt).encode("utf-8")).hexdigest()
+        if cache:
+            with self._cache_lock:
+                cached = self._response_cache.get(cache_key)
+                if cached is not None:
+                    self._response_cache.move_to_end(cache_key)
+                    return cached.copy()
+
+        raw_content = self.request_completion(payload, api_key, on_row, cancel)
+        
+        df = self.sequence_frame(self.parse_json_content(raw_content, self.is_row_list))
+        
+        if cache and not df.empty:
+            with self._cache_lock:
+                self._response_cache[cache_key] = df.copy()
+                self._response_cache.move_to_end(cache_key)
+                while len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                    self._response_cache.popitem(last=False)
+            
+        return df
+    
+    def call_api_batch(self, param_list, api_key, cancel=None):
+        """Generate one sequence per parameter set in a single API call"""
+        count = len(param_list)
+        specs = "\n---\n".join(
+            "\n".join(f"{k}: {v}" for k, v in parameters.items() if k != "Timestamp")
+            for parameters in param_list
+        )
+        
+        user_prompt = (
+            f"Generate {count} independent sequences for the following specs:\n---\n{specs}\n---\n"
+            "Use the command order, rules and speeds from the system instructions. "
+            "Identical specs must still get distinct, valid alternative sequences.\n"
+            f'Return a single JSON object {{"sequences": [[...], [...]]}} with exactly {count} arrays, '
+            "one per spec in the order given, each holding rows with Row, CMD, Description, "
+            "Condition, Unit, Tolerance, and Speed rpm."
+        )
+        
+        payload = {
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.1
+        }
+        
+        raw_content = self.request_completion(payload, api_key, cancel=cancel)
+        data = self.parse_json_content(raw_content, self.is_batch_payload)
+        
+        # The scan may land on the wrapping object or directly on the outer array
+        if isinstance(data, dict):
+            data = data.get("sequences", [])
+        if data and not isinstance(data[0], list):
+            data = [data]
+        if not data:
+            raise ValueError("API response did not contain any sequences.")
+        
+        return [self.sequence_frame(rows) for rows in data[:count]]
+    
+    def request_completion(self, payload, api_key, on_row=None, cancel=None):
+        """Post a chat completion request and return the message content
+        
+        With on_row the reply is streamed and on_row is called with each
+        sequence row as soon as its JSON object is complete. Setting the
+        cancel event raises RequestCancelled at the next checkpoint.
+        """
+        url = "https://chat01.ai/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        if on_row is None:
+            response = self.get_session().post(url, headers=headers, json=payload, timeout=API_TIMEOUT)
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelled()
             response.raise_for_status()
             response_json = response.json()
             
             message = response_json['choices'][0].get('message', {})
             raw_content = message.get('content', '')
-            
-            # Save context for continuity
-            self.chat_memory.append(parameter_text)
-            if len(self.chat_memory) > 10:  # Keep memory limited
-                self.chat_memory = self.chat_memory[-10:]
-            
-            # Extract JSON from the response, handling potential code blocks
-            json_match = re.search(r'```json\n(.*?)\n```|(\[.*\])', raw_content, re.DOTALL)
-            if json_match:
-                json_content = json_match.group(1) or json_match.group(2)
-            else:
-                json_content = raw_content
-                
-            # Clean up any remaining markdown or text
-            json_content = re.sub(r'^```.*|```$', '', json_content, flags=re.MULTILINE).strip()
-            
-            # Save raw response for debugging
-            self.last_raw_response = raw_content
-            
-            # Handle JSON parsing errors safely
+        else:
+            raw_content = self._stream_completion(url, headers, payload, on_row, cancel)
+        
+        # Save raw response for debugging
+        self.last_raw_response = raw_content
+        return raw_content
+    
+    def _stream_completion(self, url, headers, payload, on_row, cancel=None):
+        """Read a server-sent event stream, reporting rows as they complete"""
+        parser = StreamRowParser()
+        parts = []
+        with self.get_session().post(url, headers=headers, json=dict(payload, stream=True),
+                                     timeout=API_TIMEOUT, stream=True) as response:
+            with self._session_lock:
+                self._open_responses.add(response)
             try:
-                data = json.loads(json_content)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, try to extract just the array part
-                array_match = re.search(r'\[(.*)\]', json_content, re.DOTALL)
-                if array_match:
-                    cleaned_json = '[' + array_match.group(1) + ']'
-                    data = json.loads(cleaned_json)
-                else:
-                    QMessageBox.warning(self, "API Response Error", "Could not parse API response as JSON.")
-                    return pd.DataFrame()
-            
-            # Ensure all required columns are present
-            required_columns = ["Row", "CMD", "Description", "Condition", "Unit", "Tolerance", "Speed rpm"]
-            df = pd.DataFrame(data)
-            
-            # Rename any mismatched columns
-            if "Speed" in df.columns and "Speed rpm" not in df.columns:
-                df = df.rename(columns={"Speed": "Speed rpm"})
-                
-            # Add any missing columns
-            for col in required_columns:
-                if col not in df.columns:
-                    df[col] = ""
-                    
-            # Reorder columns to match required format
-            for col in required_columns:
-                if col not in df.columns:
-                    # If a required column is completely missing, add it
-                    df[col] = ""
-            
-            # Ensure we only have the columns we want in the right order
-            df = df[required_columns]
-                
-            return df
-        except Exception as e:
-            QMessageBox.critical(self, "API Error", f"API Error: {str(e)}")
-            return pd.DataFrame()
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    # Leaving the with-block closes the connection mid-stream
+                    if cancel is not None and cancel.is_set():
+                        raise RequestCancelled()
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    choices = orjson.loads(data).get("choices") or [{}]
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if not text:
+                        continue
+                    parts.append(text)
+                    for row in parser.feed(text):
+                        on_row(row)
+            finally:
+                with self._session_lock:
+                    self._open_responses.discard(response)
+        return "".join(parts)
+    
+    @staticmethod
+    def is_row_list(data):
+        """True for a JSON array whose elements are all row objects"""
+        return isinstance(data, list) and all(isinstance(row, dict) for row in data)
+    
+    @classmethod
+    def is_batch_payload(cls, data):
+        """True for a batch reply: the wrapping object, one row array or an array of them"""
+        return (isinstance(data, dict) or cls.is_row_list(data)
+                or (isinstance(data, list) and all(cls.is_row_list(rows) for rows in data)))
+    
+    @staticmethod
+    def parse_json_content(raw_content, accept=None):
+        """Extract the JSON payload from a model reply
+        
+        With accept, JSON for which accept(data) is false is skipped, so e.g.
+        an array of strings is not taken for the sequence rows.
+        """
+        # Fast path: the reply is usually one JSON document, optionally fenced
+        for opener, closer in (("[", "]"), ("{", "}")):
+            start = raw_content.find(opener)
+            if start >= 0:
+                try:
+                    data = orjson.loads(raw_content[start:raw_content.rfind(closer) + 1])
+                except orjson.JSONDecodeError:
+                    break
+                if accept is None or accept(data):
+                    return data
+                break
+        
+        # Single forward scan: decode from the first opening bracket that starts
+        # valid JSON, so surrounding prose and code fences are simply skipped
+        for opener in "[{":
+            start = raw_content.find(opener)
+            while start >= 0:
+                try:
+                    data, _ = _JSON_DECODER.raw_decode(raw_content, start)
+                    if accept is None or accept(data):
+                        return data
+                except json.JSONDecodeError:
+                    pass
+                start = raw_content.find(opener, start + 1)
+        raise ValueError("Could not parse API response as JSON.")
+    
+    @staticmethod
+    def sequence_frame(data):
+        """Build a sequence DataFrame with the required columns in order"""
+        # Rename any mismatched columns before the frame is built
+        rows = [
+            {("Speed rpm" if key == "Speed" and "Speed rpm" not in row else key): value
+             for key, value in row.items()}
+            for row in data
+        ]
+        
+        # Known schema: take only the required columns, in order, as strings
+        return _pd().DataFrame.from_records(rows, columns=SEQUENCE_COLUMNS).fillna("").astype(str)
     
     def extract_parameters(self, text):
         """Extract spring parameters from natural language text with improved pattern matching"""
         parameters = {}
+        found = {}
+        test_types = set()
         
-        # Enhanced parameter extraction patterns
-        patterns = {
-            "Free Length": r'free\s*length\s*(?:[=:]|is|of)?\s*(\d+\.?\d*)\s*(?:mm)?',
-            "Part Number": r'part\s*(?:number|#|no\.?)?\s*(?:[=:]|is)?\s*([A-Za-z0-9-_]+)',
-            "Model Number": r'model\s*(?:number|#|no\.?)?\s*(?:[=:]|is)?\s*([A-Za-z0-9-_]+)',
-            "Wire Diameter": r'wire\s*(?:diameter|thickness)?\s*(?:[=:]|is)?\s*(\d+\.?\d*)\s*(?:mm)?',
-            "Outer Diameter": r'(?:outer|outside)\s*diameter\s*(?:[=:]|is)?\s*(\d+\.?\d*)\s*(?:mm)?',
-            "Inner Diameter": r'(?:inner|inside)\s*diameter\s*(?:[=:]|is)?\s*(\d+\.?\d*)\s*(?:mm)?',
-            "Spring Rate": r'(?:spring|target)\s*rate\s*(?:[=:]|is)?\s*(\d+\.?\d*)',
-            "Test Load": r'(?:test|target)\s*load\s*(?:[=:]|is)?\s*(\d+\.?\d*)',
-            "Deflection": r'deflection\s*(?:[=:]|is)?\s*(\d+\.?\d*)',
-            "Working Length": r'working\s*length\s*(?:[=:]|is)?\s*(\d+\.?\d*)',
-            "Customer ID": r'customer\s*(?:id|number)?\s*(?:[=:]|is)?\s*([A-Za-z0-9\s]+)',
-        }
+        # Single pass over the text; the first match of each parameter wins
+        for match in _PARAMETER_SCAN.finditer(text):
+            group = match.lastgroup
+            if group in ("Compression", "Tension"):
+                test_types.add(group)
+            elif group not in found:
+                found[group] = match.group(group).strip()
         
-        # Extract test type
-        if re.search(r'\b(?:compress|compression)\b', text, re.IGNORECASE):
-            parameters["Test Type"] = "Compression"
-        elif re.search(r'\b(?:tens|tension|extension|extend)\b', text, re.IGNORECASE):
-            parameters["Test Type"] = "Tension"
-        else:
-            # Default to compression if not specified
-            parameters["Test Type"] = "Compression"
-        
-        # Extract parameters based on patterns
-        for param, pattern in patterns.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                value = match.group(1).strip()
-                # Convert to float if it's a numeric value
-                if param not in ["Part Number", "Model Number", "Customer ID"]:
-                    try:
-                        parameters[param] = float(value)
-                    except ValueError:
-                        parameters[param] = value
-                else:
+        # Extract test type, defaulting to compression if not specified
+        parameters["Test Type"] = "Tension" if test_types == {"Tension"} else "Compression"
+        
+        # Keep parameters in pattern order
+        for param, group in _GROUP_NAMES.items():
+            if group not in found:
+                continue
+            value = found[group]
+            # Convert to float if it's a numeric value
+            if param not in STRING_PARAMETERS:
+                try:
+                    parameters[param] = float(value)
+                except ValueError:
                     parameters[param] = value
+            else:
+                parameters[param] = value
         
         # Add timestamp to parameters
-        parameters["Timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        parameters["Timestamp"] = datetime.now().strftime(TIMESTAMP_FORMAT)
         
         return parameters
     
@@ -559,7 +1079,13 @@ class SpringTestApp(QMainWindow):
             if not fileName.endswith('.csv'):
                 fileName += '.csv'
             try:
-                self.current_sequence.to_csv(fileName, index=False)
+                if PYARROW_SUPPORT:
+                    import pyarrow as pa
+                    import pyarrow.csv as pacsv
+                    table = pa.Table.from_pandas(self.current_sequence, preserve_index=False)
+                    pacsv.write_csv(table, fileName)
+                else:
+                    self.current_sequence.to_csv(fileName, index=False)
                 QMessageBox.information(self, "Success", f"Saved to {fileName}")
             except Exception as e:
                 QMessageBox.critical(self, "Save Error", f"Error saving file: {str(e)}")
@@ -575,7 +1101,10 @@ class SpringTestApp(QMainWindow):
             if not fileName.endswith('.json'):
                 fileName += '.json'
             try:
-                self.current_sequence.to_json(fileName, orient="records", indent=2)
+                Path(fileName).write_bytes(orjson.dumps(
+                    self.current_sequence.to_dict(orient="records"),
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                ))
                 QMessageBox.information(self, "Success", f"Saved to {fileName}")
             except Exception as e:
                 QMessageBox.critical(self, "Save Error", f"Error saving file: {str(e)}")
@@ -584,4 +1113,6 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = SpringTestApp()
     window.show()
+    # Load pandas/requests right after the first paint instead of before it
+    QTimer.singleShot(0, _warm_imports)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -6,6 +6,7 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 import json
+import orjson
 
 
 @dataclass
@@ -35,12 +36,32 @@ class ChatMessage:
 
 @dataclass
 class TestSequence:
-    """Represents a generated test sequence with metadata."""
-    rows: List[Dict[str, Any]]
+    """Represents a generated test sequence with metadata.
+    
+    Rows are stored column-wise (as produced by ``DataFrame.to_dict('list')``);
+    row dictionaries are only built when ``rows`` is accessed.
+    """
+    columns: Dict[str, List[Any]]
     parameters: Dict[str, Any]
     created_at: datetime = field(default_factory=datetime.now)
     name: Optional[str] = None
     
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        """Build the sequence rows as a list of dictionaries."""
+        names = list(self.columns)
+        dict_ = dict
+        zip_ = zip
+        return [dict_(zip_(names, values)) for values in zip_(*self.columns.values())]
+    
+    @staticmethod
+    def columns_from_rows(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """Convert a list of row dictionaries to column lists."""
+        names = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+        return {name: [row.get(name) for row in rows] for name in names}
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert the test sequence to a dictionary."""
         return {
@@ -53,21 +74,33 @@ class TestSequence:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'TestSequence':
         """Create a TestSequence instance from a dictionary."""
+        # Sequences saved before the column layout only have "rows"
+        if "columns" in data:
+            columns = data["columns"]
+        else:
+            columns = cls.columns_from_rows(data["rows"])
         return cls(
-            rows=data["rows"],
+            columns=columns,
             parameters=data["parameters"],
             created_at=datetime.fromisoformat(data["created_at"]) if "created_at" in data else datetime.now(),
             name=data.get("name")
         )
     
     def to_json(self, indent: int = 2) -> str:
-        """Convert the test sequence to a JSON string."""
-        return json.dumps(self.to_dict(), indent=indent)
+        """Convert the test sequence to a JSON string.
+        
+        orjson only supports two-space indentation, so any non-zero indent
+        produces indented output.
+        """
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(self.to_dict(), option=option).decode("utf-8")
     
     @classmethod
     def from_json(cls, json_str: str) -> 'TestSequence':
         """Create a TestSequence instance from a JSON string."""
-        return cls.from_dict(json.loads(json_str))
+        return cls.from_dict(orjson.loads(json_str))
 
 
 @dataclass
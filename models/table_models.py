@@ -2,20 +2,29 @@
 Table models module for the Spring Test App.
 Contains Qt table models for displaying data in the UI.
 """
-import pandas as pd
-from typing import Dict, Any, Optional, List, Tuple
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple
 from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
 from PyQt5.QtGui import QColor, QBrush, QFont
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class PandasModel(QAbstractTableModel):
     """Model for displaying pandas DataFrame in QTableView"""
     
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: "pd.DataFrame"):
         super().__init__()
-        self._data = data
+        self._set_data(data)
         self._header_font = QFont()
         self._header_font.setBold(True)
+    
+    def _set_data(self, data: "pd.DataFrame") -> None:
+        """Store the DataFrame and cache its cell strings for fast cell access."""
+        self._data = data
+        # Stringify every cell once; Qt asks for the same cell many times per repaint
+        self._strs = data.astype(str).to_numpy(dtype=object)
+        self._columns = [str(col) for col in data.columns]
         
     def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
         """Return the number of rows in the model."""
@@ -31,8 +40,7 @@ class PandasModel(QAbstractTableModel):
             return QVariant()
             
         if role == Qt.DisplayRole:
-            value = self._data.iloc[index.row(), index.column()]
-            return str(value)
+            return self._strs[index.row(), index.column()]
             
         if role == Qt.TextAlignmentRole:
             return Qt.AlignCenter
@@ -47,7 +55,7 @@ class PandasModel(QAbstractTableModel):
     def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> QVariant:
         """Return the header data."""
         if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            return str(self._data.columns[section])
+            return self._columns[section]
             
         if orientation == Qt.Vertical and role == Qt.DisplayRole:
             return str(section + 1)
@@ -64,17 +72,17 @@ class PandasModel(QAbstractTableModel):
     def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
         """Sort the model by the given column."""
         self.layoutAboutToBeChanged.emit()
-        self._data = self._data.sort_values(
+        self._set_data(self._data.sort_values(
             by=self._data.columns[column],
             ascending=(order == Qt.AscendingOrder)
-        )
+        ))
         self.layoutChanged.emit()
     
-    def update_data(self, data: pd.DataFrame) -> None:
+    def update_data(self, data: "pd.DataFrame") -> None:
         """Update the model data."""
-        self.layoutAboutToBeChanged.emit()
-        self._data = data
-        self.layoutChanged.emit()
+        self.beginResetModel()
+        self._set_data(data)
+        self.endResetModel()
 
 
 class CommandTableModel(QAbstractTableModel):
@@ -4,18 +4,13 @@ Contains functions for managing chat history.
 """
 import os
 import json
-import base64
 import logging
-from typing import List, Optional
+import collections
+import itertools
+from typing import Deque, List, Optional
 from models.data_models import ChatMessage
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-
-# App salt for encryption (do not change) - same as settings_service
-APP_SALT = b'SpringTestApp_2025_Salt_Value'
-# App encryption key derivation password - same as settings_service
-APP_PASSWORD = b'SpringTestApp_Secure_Password_2025'
+# Same app key as the settings; cryptography is imported on first use
+from services.settings_service import get_app_fernet, get_app_key
 
 class ChatService:
     """Service for managing chat history."""
@@ -27,12 +22,14 @@ class ChatService:
             settings_service: Settings service instance.
             max_history: Maximum number of messages to keep in history.
         """
-        self.history = []
+        self.history = collections.deque(maxlen=max_history)  # Oldest messages drop off automatically
         self.max_history = max_history
+        self.message_count = 0  # Messages added since the history was last replaced
+        self.history_version = 0  # Bumped whenever the history is cleared or reloaded
+        self._dirty = False  # True when the history has changes not yet saved
         self.settings_service = settings_service
         self.data_dir = self._ensure_data_dir()
         self.history_file = os.path.join(self.data_dir, "chat_history.dat")
-        self.encryption_key = self._generate_key()
         self.load_history()
     
     def _ensure_data_dir(self):
@@ -49,20 +46,14 @@ class ChatService:
                 f.write("# Ignore all files in this directory\n*\n!.gitignore\n")
         return data_dir
     
-    def _generate_key(self):
-        """Generate encryption key from app password.
+    @property
+    def encryption_key(self):
+        """Get the key used to encrypt the chat history.
         
         Returns:
-            Encryption key.
+            The shared app encryption key, derived on first use.
         """
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=APP_SALT,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(APP_PASSWORD))
-        return key
+        return get_app_key()
     
     def add_message(self, role: str, content: str) -> ChatMessage:
         """Add a message to the chat history.
@@ -76,24 +67,48 @@ class ChatService:
         """
         message = ChatMessage(role=role, content=content)
         self.history.append(message)
-        
-        # Limit history size
-        if len(self.history) > self.max_history:
-            self.history = self.history[-self.max_history:]
+        self.message_count += 1
+        self._dirty = True
         
         return message
     
-    def get_history(self) -> List[ChatMessage]:
+    def get_history(self) -> Deque[ChatMessage]:
         """Get the chat history.
         
+        The underlying deque is returned without copying; callers must not modify it.
+        
         Returns:
-            List of chat messages.
+            Deque of chat messages.
         """
         return self.history
     
+    def get_new_messages(self, since_count: int) -> List[ChatMessage]:
+        """Get the messages added after the first since_count messages.
+        
+        Args:
+            since_count: Value of message_count the caller has already seen.
+            
+        Returns:
+            List of messages added since then that are still in the history.
+        """
+        # message_count of the oldest message still held in the deque
+        first = self.message_count - len(self.history)
+        return list(itertools.islice(self.history, max(since_count - first, 0), None))
+    
+    def _reset_history(self, messages) -> None:
+        """Replace the chat history with the given messages.
+        
+        Args:
+            messages: Messages for the new history.
+        """
+        self.history = collections.deque(messages, maxlen=self.max_history)
+        self.message_count = len(self.history)
+        self.history_version += 1
+        self._dirty = True
+    
     def clear_history(self) -> None:
         """Clear the chat history."""
-        self.history = []
+        self._reset_history(())
     
     def load_history(self) -> None:
         """Load chat history from file."""
@@ -107,25 +122,32 @@ class ChatService:
                 encrypted_data = f.read()
             
             # Decrypt data
-            fernet = Fernet(self.encryption_key)
+            fernet = get_app_fernet()
             decrypted_data = fernet.decrypt(encrypted_data)
             
             # Parse JSON
             history_data = json.loads(decrypted_data.decode('utf-8'))
             
             # Convert to ChatMessage objects
-            self.history = [
+            self._reset_history(
                 ChatMessage(role=msg["role"], content=msg["content"])
                 for msg in history_data
-            ]
+            )
+            self._dirty = False  # Matches the file
             
             logging.info(f"Loaded {len(self.history)} chat messages")
         except Exception as e:
             logging.error(f"Error loading chat history: {str(e)}")
-            self.history = []
+            self._reset_history(())
     
     def save_history(self) -> None:
-        """Save chat history to file."""
+        """Save chat history to file.
+        
+        Nothing is written if the history is unchanged since it was last loaded or saved.
+        """
+        if not self._dirty:
+            return
+        
         try:
             # Convert to JSON-serializable format
             history_data = [
@@ -137,13 +159,14 @@ class ChatService:
             history_json = json.dumps(history_data, indent=2)
             
             # Encrypt data
-            fernet = Fernet(self.encryption_key)
+            fernet = get_app_fernet()
             encrypted_data = fernet.encrypt(history_json.encode('utf-8'))
             
             # Write encrypted data
             with open(self.history_file, "wb") as f:
                 f.write(encrypted_data)
             
+            self._dirty = False
             logging.info(f"Saved {len(self.history)} chat messages")
         except Exception as e:
             logging.error(f"Error saving chat history: {str(e)}")
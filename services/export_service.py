@@ -3,7 +3,6 @@ Export service for the Spring Test App.
 Contains classes and functions for exporting sequences to different formats.
 """
 import os
-import pandas as pd
 import json
 from typing import Dict, Any, Optional, List, Union, Tuple
 from models.data_models import TestSequence
@@ -67,8 +66,10 @@ class ExportService:
             Tuple of (success flag, error message)
         """
         try:
+            import pandas as pd
+            
             # Create DataFrame from sequence
-            df = pd.DataFrame(sequence.rows)
+            df = pd.DataFrame(sequence.columns)
             
             # Add a header row with metadata
             metadata = [
@@ -129,8 +130,10 @@ class ExportService:
             Tuple of (success flag, error message)
         """
         try:
+            import pandas as pd
+            
             # Create DataFrame from sequence
-            df = pd.DataFrame(sequence.rows)
+            df = pd.DataFrame(sequence.columns)
             
             # Create parameters DataFrame
             param_data = [[key, str(value)] for key, value in sequence.parameters.items() if key != "Timestamp"]
@@ -2,11 +2,22 @@
 Sequence generator service for the Spring Test App.
 Contains classes and functions for generating test sequences.
 """
-import pandas as pd
-from typing import Dict, Any, Optional, List, Tuple, Callable
+import collections
+import logging
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple, Callable
 from utils.api_client import APIClient
 from models.data_models import TestSequence, SpringSpecification
-from PyQt5.QtCore import QObject, pyqtSignal
+from utils.constants import SEQUENCE_COLUMNS
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Number of generated sequences kept in the history
+HISTORY_LIMIT = 10
+
+# Columns every sequence row must have
+_REQUIRED_COLUMN_SET = frozenset(SEQUENCE_COLUMNS)
 
 
 class SequenceGenerator(QObject):
@@ -28,7 +39,11 @@ class SequenceGenerator(QObject):
         self.last_parameters = {}
         self.spring_specification = None
         self.last_sequence = None
-        self.history = []
+        self.history = collections.deque(maxlen=HISTORY_LIMIT)  # Oldest entries drop off automatically
+        self._last_progress = -1
+        # Bind the emit methods once; each signal attribute access builds a new bound object
+        self._emit_progress = self.progress_updated.emit
+        self._emit_status = self.status_updated.emit
     
     def set_api_key(self, api_key: str) -> None:
         """Set the API key for the API client.
@@ -231,7 +246,6 @@ class SequenceGenerator(QObject):
             movement_speed: Calculated movement speed in rpm
             contact_force: Calculated contact force in N
         """
-        import logging
         logger = logging.getLogger("SpringTestApp")
         
         # Format input parameters
@@ -254,7 +268,8 @@ class SequenceGenerator(QObject):
         logger.debug(f"  Movement speed: {movement_speed} rpm")
         logger.debug(f"  Contact force: {contact_force} N")
     
-    def generate_sequence(self, parameters: Dict[str, Any]) -> Tuple[Optional[TestSequence], str]:
+    def generate_sequence(self, parameters: Dict[str, Any],
+                          timeout: Optional[float] = None) -> Tuple[Optional[TestSequence], str]:
         """Generate a test sequence based on parameters (synchronous version).
         
         Note: This method is kept for backward compatibility but should be avoided
@@ -262,6 +277,7 @@ class SequenceGenerator(QObject):
         
         Args:
             parameters: Dictionary of spring parameters.
+            timeout: Seconds to wait for the result, or None to wait indefinitely.
             
         Returns:
             Tuple of (TestSequence object, error message if any)
@@ -273,7 +289,7 @@ class SequenceGenerator(QObject):
         parameters_with_spec = self._prepare_parameters_with_specification(parameters)
         
         # Generate sequence
-        df, response_text = self.api_client.generate_sequence(parameters_with_spec)
+        df, response_text = self.api_client.generate_sequence(parameters_with_spec, timeout=timeout)
         
         # If generation failed, return error
         if df.empty:
@@ -281,7 +297,7 @@ class SequenceGenerator(QObject):
         
         # Create TestSequence object
         sequence = TestSequence(
-            rows=df.to_dict('records'),
+            columns=df.to_dict('list'),
             parameters=parameters_with_spec
         )
         
@@ -290,8 +306,6 @@ class SequenceGenerator(QObject):
         
         # Add to history
         self.history.append(sequence)
-        if len(self.history) > 10:  # Keep history limited
-            self.history = self.history[-10:]
         
         return sequence, ""
     
@@ -308,14 +322,28 @@ class SequenceGenerator(QObject):
         parameters_with_spec = self._prepare_parameters_with_specification(parameters)
         
         # Start async generation
+        self._last_progress = -1
         self.api_client.generate_sequence_async(
             parameters_with_spec,
             self._on_sequence_generated,
-            self.progress_updated.emit,  # Forward progress signal
-            self.status_updated.emit     # Forward status signal
+            self._forward_progress,      # Forward progress, already coalesced by the client
+            self._emit_status            # Forward status signal
         )
     
-    def _on_sequence_generated(self, df: pd.DataFrame, error_msg: str) -> None:
+    @pyqtSlot(int)
+    def _forward_progress(self, progress: int) -> None:
+        """Forward a progress update, dropping repeats.
+        
+        Args:
+            progress: Progress percentage (0-100).
+        """
+        if progress == self._last_progress:
+            return
+        self._last_progress = progress
+        self._emit_progress(progress)
+    
+    @pyqtSlot(object, str)
+    def _on_sequence_generated(self, df: "pd.DataFrame", error_msg: str) -> None:
         """Handle sequence generation completion.
         
         Args:
@@ -333,7 +361,7 @@ class SequenceGenerator(QObject):
         if not df.empty:
             # Create TestSequence object
             sequence = TestSequence(
-                rows=df.to_dict('records'),
+                columns=df.to_dict('list'),
                 parameters=self.last_parameters
             )
             
@@ -342,8 +370,6 @@ class SequenceGenerator(QObject):
             
             # Add to history
             self.history.append(sequence)
-            if len(self.history) > 10:  # Keep history limited
-                self.history = self.history[-10:]
         
         # Emit signal
         self.sequence_generated.emit(sequence, error_msg)
@@ -364,9 +390,9 @@ class SequenceGenerator(QObject):
         """Get the sequence generation history.
         
         Returns:
-            List of generated sequences.
+            List of generated sequences, oldest first.
         """
-        return self.history
+        return list(self.history)
     
     def add_to_history(self, sequence: TestSequence) -> None:
         """Add a sequence to the history.
@@ -375,12 +401,10 @@ class SequenceGenerator(QObject):
             sequence: Sequence to add.
         """
         self.history.append(sequence)
-        if len(self.history) > 10:  # Keep history limited
-            self.history = self.history[-10:]
     
     def clear_history(self) -> None:
         """Clear the sequence generation history."""
-        self.history = []
+        self.history.clear()
     
     def validate_sequence(self, sequence: Dict[str, Any]) -> Tuple[bool, str]:
         """Validate a sequence.
@@ -395,12 +419,11 @@ class SequenceGenerator(QObject):
         if not sequence:
             return False, "Sequence is empty"
         
-        required_columns = ["Row", "CMD", "Description", "Condition", "Unit", "Tolerance", "Speed rpm"]
-        
-        # Check if all required columns are present
-        for col in required_columns:
-            if col not in sequence[0]:
-                return False, f"Missing required column: {col}"
+        # Check if all required columns are present; keys() is set-like, so this is one C-level call
+        missing = _REQUIRED_COLUMN_SET - sequence[0].keys()
+        if missing:
+            missing_columns = ", ".join(col for col in SEQUENCE_COLUMNS if col in missing)
+            return False, f"Missing required columns: {missing_columns}"
         
         # More validation could be added here
         
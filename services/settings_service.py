@@ -4,11 +4,11 @@ Contains functions for saving and loading application settings.
 """
 import os
 import json
+import atexit
 import base64
 import logging
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+import threading
+import functools
 from models.data_models import SpringSpecification, SetPoint
 
 # Default settings
@@ -20,11 +20,87 @@ DEFAULT_SETTINGS = {
     "spring_specification": None
 }
 
+# Delay in seconds used to coalesce bursts of setting changes into one write
+SAVE_DELAY = 0.5
+
+# Smallest possible Fernet token: version, timestamp, IV, one cipher block and HMAC
+# (73 bytes) in urlsafe base64. Anything shorter cannot be a valid settings file.
+FERNET_MIN_TOKEN_SIZE = 100
+
 # App salt for encryption (do not change)
 APP_SALT = b'SpringTestApp_2025_Salt_Value'
 # App encryption key derivation password
 APP_PASSWORD = b'SpringTestApp_Secure_Password_2025'
 
+
+def _derive_key():
+    """Derive the encryption key from the app password.
+    
+    Returns:
+        Encryption key.
+    """
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=APP_SALT,
+        iterations=100000,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(APP_PASSWORD))
+
+
+# Salt and password are constants, so the 100k-iteration PBKDF2 runs once per process.
+# cryptography is imported on first use to keep it off the startup path.
+_APP_KEY = None
+_FERNET = None
+_FERNET_LOCK = threading.Lock()
+
+
+def get_app_fernet():
+    """Get the shared Fernet instance, importing cryptography on first use.
+    
+    Returns:
+        Fernet instance for the app key.
+    """
+    global _APP_KEY, _FERNET
+    if _FERNET is None:
+        with _FERNET_LOCK:
+            if _FERNET is None:
+                from cryptography.fernet import Fernet
+                _APP_KEY = _derive_key()
+                _FERNET = Fernet(_APP_KEY)
+    return _FERNET
+
+
+def get_app_key():
+    """Get the app encryption key, deriving it on first use.
+    
+    Returns:
+        Encryption key.
+    """
+    get_app_fernet()
+    return _APP_KEY
+
+
+@functools.lru_cache(maxsize=1)
+def _ensure_data_dir():
+    """Ensure the data directory exists, once per process.
+    
+    Returns:
+        Path to the data directory.
+    """
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "appdata")
+    os.makedirs(data_dir, exist_ok=True)
+    # Create .gitignore to prevent accidental commit of sensitive data
+    gitignore = os.path.join(data_dir, ".gitignore")
+    if not os.path.exists(gitignore):
+        with open(gitignore, "w") as f:
+            f.write("# Ignore all files in this directory\n*\n!.gitignore\n")
+    return data_dir
+
+
 class SettingsService:
     """Service for managing application settings."""
     
@@ -33,47 +109,51 @@ class SettingsService:
         self.settings = DEFAULT_SETTINGS.copy()
         self.settings_dir = self._ensure_data_dir()
         self.settings_file = os.path.join(self.settings_dir, "settings.dat")
-        self.encryption_key = self._generate_key()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._pending = None  # Snapshot waiting for the save timer
+        self._snapshot_count = 0
+        self._written_snapshot = 0
         self.load_settings()
+        # The save timer is a daemon thread, so write any pending change at exit
+        atexit.register(self.flush)
         
         # Initialize spring specification if it doesn't exist
         if "spring_specification" not in self.settings or self.settings["spring_specification"] is None:
             self.settings["spring_specification"] = SpringSpecification().to_dict()
     
-    def _ensure_data_dir(self):
-        """Ensure the data directory exists.
+    @property
+    def encryption_key(self):
+        """Get the key used to encrypt the settings file.
         
         Returns:
-            Path to the data directory.
+            The shared app encryption key, derived on first use.
         """
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "appdata")
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-            # Create .gitignore to prevent accidental commit of sensitive data
-            with open(os.path.join(data_dir, ".gitignore"), "w") as f:
-                f.write("# Ignore all files in this directory\n*\n!.gitignore\n")
-        return data_dir
+        return get_app_key()
     
-    def _generate_key(self):
-        """Generate encryption key from app password.
+    def _ensure_data_dir(self):
+        """Ensure the data directory exists.
         
         Returns:
-            Encryption key.
+            Path to the data directory.
         """
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=APP_SALT,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(APP_PASSWORD))
-        return key
+        return _ensure_data_dir()
     
     def load_settings(self):
         """Load settings from file."""
-        if not os.path.exists(self.settings_file):
+        try:
+            file_size = os.stat(self.settings_file).st_size
+        except FileNotFoundError:
             logging.info("Settings file not found, using defaults")
             return
+        except OSError as e:
+            logging.error(f"Error loading settings: {str(e)}")
+            return
+        
+        # Fail fast on empty or truncated files instead of going through Fernet's InvalidToken path
+        if file_size < FERNET_MIN_TOKEN_SIZE:
+            logging.warning(f"Settings file is too small to be valid ({file_size} bytes), using defaults")
+            return
         
         try:
             # Read encrypted data
@@ -81,8 +161,7 @@ class SettingsService:
                 encrypted_data = f.read()
             
             # Decrypt data
-            fernet = Fernet(self.encryption_key)
-            decrypted_data = fernet.decrypt(encrypted_data)
+            decrypted_data = get_app_fernet().decrypt(encrypted_data)
             
             # Parse JSON
             loaded_settings = json.loads(decrypted_data.decode('utf-8'))
@@ -97,20 +176,93 @@ class SettingsService:
         """Save settings to file."""
         try:
             # Convert settings to JSON
-            settings_json = json.dumps(self.settings, indent=2)
-            
+            snapshot = self._snapshot()
+        except Exception as e:
+            logging.error(f"Error saving settings: {str(e)}")
+            return
+        
+        # Any scheduled save holds an older snapshot, so it is superseded
+        with self._save_lock:
+            timer = self._save_timer
+            self._save_timer = None
+            self._pending = None
+        if timer is not None:
+            timer.cancel()
+        self._write_settings(snapshot)
+    
+    def _snapshot(self):
+        """Serialize the current settings.
+        
+        Called on the thread that changes the settings, so the save timer never
+        reads the live dict while it is being modified.
+        
+        Returns:
+            Tuple of (snapshot number, settings JSON).
+        """
+        settings_json = json.dumps(self.settings, indent=2)
+        with self._save_lock:
+            self._snapshot_count += 1
+            return self._snapshot_count, settings_json
+    
+    def _write_settings(self, snapshot):
+        """Encrypt and write a settings snapshot.
+        
+        Args:
+            snapshot: Tuple of (snapshot number, settings JSON) from _snapshot.
+        """
+        number, settings_json = snapshot
+        try:
             # Encrypt data
-            fernet = Fernet(self.encryption_key)
-            encrypted_data = fernet.encrypt(settings_json.encode('utf-8'))
+            encrypted_data = get_app_fernet().encrypt(settings_json.encode('utf-8'))
             
-            # Write encrypted data
-            with open(self.settings_file, "wb") as f:
-                f.write(encrypted_data)
+            # Write encrypted data atomically so a crash mid-write keeps the old file
+            tmp_file = self.settings_file + ".tmp"
+            with self._save_lock:
+                # A timer that was already writing must not overwrite a newer save
+                if number <= self._written_snapshot:
+                    return
+                with open(tmp_file, "wb") as f:
+                    f.write(encrypted_data)
+                os.replace(tmp_file, self.settings_file)
+                self._written_snapshot = number
             
             logging.info("Settings saved successfully")
         except Exception as e:
             logging.error(f"Error saving settings: {str(e)}")
     
+    def _schedule_save(self):
+        """Save settings after a short delay, restarting the delay on each change."""
+        snapshot = self._snapshot()
+        with self._save_lock:
+            self._pending = snapshot
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(SAVE_DELAY, self._save_scheduled)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def _save_scheduled(self):
+        """Run a scheduled save unless it was already flushed."""
+        with self._save_lock:
+            # A newer change or a flush has superseded this timer
+            if self._save_timer is not threading.current_thread():
+                return
+            self._save_timer = None
+            snapshot, self._pending = self._pending, None
+        if snapshot is not None:
+            self._write_settings(snapshot)
+    
+    def flush(self):
+        """Write any pending settings changes immediately."""
+        with self._save_lock:
+            timer = self._save_timer
+            self._save_timer = None
+            snapshot, self._pending = self._pending, None
+        if timer is not None:
+            timer.cancel()
+        if snapshot is not None:
+            self._write_settings(snapshot)
+    
     def get_api_key(self):
         """Get the API key.
         
@@ -126,7 +278,7 @@ class SettingsService:
             api_key: The API key to set.
         """
         self.settings["api_key"] = api_key
-        self.save_settings()
+        self._schedule_save()
     
     def get_default_export_format(self):
         """Get the default export format.
@@ -143,7 +295,7 @@ class SettingsService:
             format: The format to use.
         """
         self.settings["default_export_format"] = format
-        self.save_settings()
+        self._schedule_save()
     
     def add_recent_sequence(self, sequence_id):
         """Add a sequence to the recent sequences list.
@@ -153,16 +305,15 @@ class SettingsService:
         """
         recent = self.settings.get("recent_sequences", [])
         
-        # Remove the sequence if it already exists
-        if sequence_id in recent:
-            recent.remove(sequence_id)
-        
-        # Add to the beginning of the list
-        recent.insert(0, sequence_id)
+        # Already the most recent: nothing changes, so skip the encrypted write
+        if recent and recent[0] == sequence_id:
+            return
         
-        # Limit the list to 10 items
-        self.settings["recent_sequences"] = recent[:10]
-        self.save_settings()
+        # Move to the front in one pass, limiting the list to 10 items
+        self.settings["recent_sequences"] = [sequence_id] + [
+            recent_id for recent_id in recent if recent_id != sequence_id
+        ][:9]
+        self._schedule_save()
     
     def get_recent_sequences(self):
         """Get the list of recent sequences.
@@ -192,7 +343,7 @@ class SettingsService:
             specification: The SpringSpecification object.
         """
         self.settings["spring_specification"] = specification.to_dict()
-        self.save_settings()
+        self._schedule_save()
     
     def update_spring_basic_info(self, part_name, part_number, part_id, 
                                 free_length, coil_count, wire_dia, outer_dia,
@@ -7,12 +7,17 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdi
                            QSizePolicy)
 from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot, QTimer, QSize
 from PyQt5.QtGui import QFont, QTextCursor, QIcon, QMovie
-import pandas as pd
+import html
+import re
 
 from utils.text_parser import extract_parameters
 from models.data_models import TestSequence, ChatMessage
 from utils.constants import USER_ICON, ASSISTANT_ICON
 
+# Message headers, built once rather than per rendered message
+USER_HEADER = f"<p><b>{USER_ICON} You:</b><br>"
+ASSISTANT_HEADER = f"<p><b>{ASSISTANT_ICON} Assistant:</b><br>"
+
 
 class ChatPanel(QWidget):
     """Chat panel widget for the Spring Test App."""
@@ -38,6 +43,8 @@ class ChatPanel(QWidget):
         
         # State variables
         self.is_generating = False
+        self._displayed_version = None  # chat_service.history_version shown in chat_display
+        self._displayed_count = 0  # chat_service.message_count shown in chat_display
         
         # Set up the UI
         self.init_ui()
@@ -84,11 +91,9 @@ class ChatPanel(QWidget):
         self.progress_bar.setFormat("%p% - %v")
         progress_layout.addWidget(self.progress_bar, 1)
         
-        # Loading animation
+        # Loading animation (the movie is only created while generating)
         self.loading_label = QLabel()
-        self.loading_movie = QMovie("resources/loading.gif")
-        self.loading_movie.setScaledSize(QSize(24, 24))
-        self.loading_label.setMovie(self.loading_movie)
+        self.loading_movie = None
         self.loading_label.setFixedSize(24, 24)
         progress_layout.addWidget(self.loading_label)
         
@@ -148,28 +153,60 @@ class ChatPanel(QWidget):
         self.sequence_generator.status_updated.connect(self.on_status_updated)
     
     def refresh_chat_display(self):
-        """Refresh the chat display with current history."""
-        self.chat_display.clear()
-        
-        # Get chat history
-        history = self.chat_service.get_history()
-        
-        # Display each message
-        for message in history:
-            if message.role == "user":
-                self.chat_display.append(f"<b>{USER_ICON} You:</b>")
-                self.chat_display.append(message.content)
-                self.chat_display.append("")
-            else:
-                self.chat_display.append(f"<b>{ASSISTANT_ICON} Assistant:</b>")
-                self.chat_display.append(message.content)
-                self.chat_display.append("")
-        
-        # Scroll to bottom
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.chat_display.setTextCursor(cursor)
+        """Refresh the chat display with current history.
+        
+        Only messages added since the last refresh are rendered; the display is
+        rebuilt when the history has been replaced (e.g. after it was cleared).
+        """
+        chat_service = self.chat_service
+        if chat_service.history_version != self._displayed_version:
+            # History was replaced; render it from scratch
+            self.chat_display.clear()
+            self._displayed_version = chat_service.history_version
+            self._displayed_count = 0
+        
+        self._append_messages(chat_service.get_new_messages(self._displayed_count))
+        self._displayed_count = chat_service.message_count
+    
+    def _append_messages(self, messages):
+        """Render messages at the end of the chat display in a single insert.
+        
+        Args:
+            messages: Messages to render.
+        """
+        if not messages:
+            return
+        
+        # Build one HTML string and insert it once so the display repaints once.
+        # Hot names are bound to locals to avoid global/attribute lookups per message.
+        fragments = []
+        append = fragments.append
+        escape = html.escape
+        user_header = USER_HEADER
+        assistant_header = ASSISTANT_HEADER
+        for message in messages:
+            append(user_header if message.role == "user" else assistant_header)
+            append(escape(message.content).replace("\n", "<br>"))
+            append("</p>")
+        
+        self.chat_display.setUpdatesEnabled(False)
+        try:
+            # Insert through a document cursor; the widget's own cursor is left alone
+            document = self.chat_display.document()
+            cursor = QTextCursor(document)
+            cursor.movePosition(QTextCursor.End)
+            if not document.isEmpty():
+                # Start a new block so the first message doesn't merge into the last one
+                cursor.insertBlock()
+            cursor.insertHtml("".join(fragments))
+            
+            # Scroll to bottom
+            scroll_bar = self.chat_display.verticalScrollBar()
+            scroll_bar.setValue(scroll_bar.maximum())
+        finally:
+            self.chat_display.setUpdatesEnabled(True)
     
+    @pyqtSlot()
     def on_send_clicked(self):
         """Handle send button clicks (for both chat and generation)."""
         # Get user input
@@ -216,6 +253,7 @@ class ChatPanel(QWidget):
         # Start generation
         self.start_generation(parameters)
     
+    @pyqtSlot()
     def on_cancel_clicked(self):
         """Handle cancel button clicks."""
         if self.is_generating:
@@ -236,6 +274,7 @@ class ChatPanel(QWidget):
             # Reset generating state
             self.set_generating_state(False)
     
+    @pyqtSlot()
     def on_clear_input_clicked(self):
         """Handle clear input button clicks."""
         self.user_input.clear()
@@ -287,16 +326,36 @@ class ChatPanel(QWidget):
             # Show progress indicators
             self.progress_bar.show()
             self.loading_label.show()
-            self.loading_movie.start()
+            self.start_loading_animation()
             self.cancel_btn.show()
         else:
             # Hide progress indicators
             self.progress_bar.hide()
             self.loading_label.hide()
-            self.loading_movie.stop()
+            self.stop_loading_animation()
             self.cancel_btn.hide()
             self.status_label.setText("Ready")
     
+    def start_loading_animation(self):
+        """Create the loading animation on demand and start it."""
+        if self.loading_movie is None:
+            self.loading_movie = QMovie("resources/loading.gif")
+            # Decode frames as they are shown instead of keeping them all in memory
+            self.loading_movie.setCacheMode(QMovie.CacheNone)
+            self.loading_movie.setScaledSize(QSize(24, 24))
+            self.loading_label.setMovie(self.loading_movie)
+        self.loading_movie.start()
+    
+    def stop_loading_animation(self):
+        """Stop the loading animation and release its frames."""
+        if self.loading_movie is None:
+            return
+        self.loading_movie.stop()
+        self.loading_label.clear()
+        self.loading_movie.deleteLater()
+        self.loading_movie = None
+    
+    @pyqtSlot(object, str)
     def on_sequence_generated_async(self, sequence, error_msg):
         """Handle sequence generation completion from async operation.
         
@@ -304,6 +363,8 @@ class ChatPanel(QWidget):
             sequence: Generated sequence or None if failed.
             error_msg: Error message if generation failed.
         """
+        import pandas as pd  # Already loaded by the worker that produced the result
+        
         # Reset generating state
         self.set_generating_state(False)
         
@@ -337,6 +398,7 @@ class ChatPanel(QWidget):
         # Emit signal to show sequence in results panel
         self.sequence_generated.emit(sequence)
     
+    @pyqtSlot(int)
     def on_progress_updated(self, progress):
         """Handle progress updates.
         
@@ -345,6 +407,7 @@ class ChatPanel(QWidget):
         """
         self.progress_bar.setValue(progress)
     
+    @pyqtSlot(str)
     def on_status_updated(self, status):
         """Handle status updates.
         
@@ -391,9 +454,6 @@ class ChatPanel(QWidget):
         ]):
             return False
         
-        # Import regex for pattern matching
-        import re
-        
         # Create parsed data dictionary
         parsed_data = {
             "basic_info": {},
@@ -17,6 +17,7 @@ from ui.sidebar import SidebarWidget
 from ui.chat_panel import ChatPanel
 from ui.results_panel import ResultsPanel
 from ui.specifications_panel import SpecificationsPanel
+from ui.styles import apply_theme as _apply_theme
 
 
 class MainWindow(QMainWindow):
@@ -56,12 +57,18 @@ class MainWindow(QMainWindow):
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(icon_path))
         
+        # Hold off painting while the widget tree is built, so it is laid out and painted once
+        self.setUpdatesEnabled(False)
+        
         # Create the central widget and layout
         central_widget = QWidget()
         main_layout = QHBoxLayout()
         
         # Create splitter for sidebar and main content
         self.splitter = QSplitter(Qt.Horizontal)
+        # Lay out the panels once when the drag ends rather than on every mouse move
+        self.splitter.setOpaqueResize(False)
+        self.splitter.setChildrenCollapsible(False)
         
         # Create sidebar
         self.sidebar = SidebarWidget(self.settings_service)
@@ -108,6 +115,8 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
         
+        self.setUpdatesEnabled(True)
+        
         # Apply theme
         self.apply_theme()
     
@@ -139,8 +148,9 @@ class MainWindow(QMainWindow):
     
     def on_clear_chat(self):
         """Handle clear chat button clicks."""
-        # Clear chat history
+        # Clear chat history, and the context the API client carries into new prompts
         self.chat_service.clear_history()
+        self.sequence_generator.api_client.chat_memory.clear()
         
         # Update chat panel
         self.chat_panel.refresh_chat_display()
@@ -166,8 +176,7 @@ class MainWindow(QMainWindow):
     
     def apply_theme(self):
         """Apply the theme."""
-        from ui.styles import apply_theme
-        apply_theme(self)
+        _apply_theme(self)
     
     def closeEvent(self, event):
         """Handle window close event.
@@ -175,8 +184,8 @@ class MainWindow(QMainWindow):
         Args:
             event: Close event.
         """
-        # Save settings
-        self.settings_service.save_settings()
+        # Write any settings changes still waiting on the save delay
+        self.settings_service.flush()
         
         # Save chat history
         self.chat_service.save_history()
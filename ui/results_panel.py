@@ -2,13 +2,14 @@
 Results panel module for the Spring Test App.
 Contains the components for displaying and exporting test sequences.
 """
+import json
+
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableView, 
                            QPushButton, QHeaderView, QFileDialog, QMessageBox, 
                            QComboBox, QGroupBox, QFormLayout, QTabWidget, QTextEdit)
 from PyQt5.QtCore import Qt, pyqtSlot
 from PyQt5.QtGui import QFont
 
-import pandas as pd
 from models.table_models import PandasModel
 from models.data_models import TestSequence
 from utils.constants import FILE_FORMATS
@@ -144,7 +145,8 @@ class ResultsPanel(QWidget):
         self.current_sequence = sequence
         
         # Display in table
-        df = pd.DataFrame(sequence.rows)
+        import pandas as pd
+        df = pd.DataFrame(sequence.columns)
         model = PandasModel(df)
         self.results_table.setModel(model)
         
@@ -158,7 +160,6 @@ class ResultsPanel(QWidget):
         self.parameters_display.setHtml(params_text)
         
         # Update JSON display
-        import json
         json_text = json.dumps(sequence.to_dict(), indent=2)
         self.json_display.setText(json_text)
         
@@ -2,13 +2,17 @@
 Styles module for the Spring Test App.
 Contains style sheets and theming functions.
 """
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QFont
+
+# Application font family; set on the application rather than in the style sheet
+APP_FONT_FAMILY = "Arial"
 
 # Application style sheet
 APP_STYLE = """
 QWidget {
     background-color: #F0F0F0;
     color: #333333;
-    font-family: Arial, sans-serif;
 }
 
 QMainWindow {
@@ -190,7 +194,30 @@ def get_style_sheet():
 def apply_theme(widget):
     """Apply the theme to a widget.
     
+    The style sheet and font are set once on the application, so Qt parses
+    them a single time and cascades them to every widget; later calls are no-ops.
+    
     Args:
         widget: The widget to apply the theme to.
     """
-    widget.setStyleSheet(get_style_sheet()) 
\ No newline at end of file
+    app = QApplication.instance()
+    if app is None:
+        widget.setFont(_app_font(widget.font()))
+        widget.setStyleSheet(APP_STYLE)
+    elif app.styleSheet() != APP_STYLE:
+        app.setFont(_app_font(app.font()))
+        app.setStyleSheet(APP_STYLE)
+
+def _app_font(base):
+    """Get the application font.
+    
+    Args:
+        base: Font whose size and other properties are kept.
+        
+    Returns:
+        The font with the application family and a sans-serif fallback.
+    """
+    font = QFont(base)
+    font.setFamily(APP_FONT_FAMILY)
+    font.setStyleHint(QFont.SansSerif)
+    return font
@@ -2,24 +2,131 @@
 API client module for the Spring Test App.
 Contains functions for making API requests and handling responses.
 """
-import requests
-import pandas as pd
 import json
+import orjson
+import re
 import time
+import functools
 import threading
-from typing import Dict, Any, Optional, List, Tuple, Union, Callable
-from PyQt5.QtCore import QObject, pyqtSignal
-from utils.constants import API_ENDPOINT, DEFAULT_MODEL, DEFAULT_TEMPERATURE, SYSTEM_PROMPT_TEMPLATE, USER_PROMPT_TEMPLATE
+import collections
+import concurrent.futures
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple, Union, Callable
+from PyQt5.QtCore import Qt, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from utils.constants import (
+    API_ENDPOINT, DEFAULT_MODEL, DEFAULT_TEMPERATURE, load_prompt,
+    SEQUENCE_COLUMNS, SEQUENCE_COLUMN_ALIASES
+)
 from utils.text_parser import extract_command_sequence, format_parameter_text, extract_error_message
 
+# pandas and httpx are imported where they are used to keep them off the startup path
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Interval in milliseconds at which worker progress/status is forwarded to the GUI
+PROGRESS_FLUSH_INTERVAL = 50
+
+# Number of parameter texts kept as context for follow-up requests
+CHAT_MEMORY_SIZE = 10
+# Number of request payloads kept for debugging
+REQUEST_HISTORY_SIZE = 100
+
+# Client errors (4xx) that are worth retrying; any other 4xx fails immediately
+RETRIABLE_CLIENT_ERRORS = frozenset((408, 429))
+# Upper bound in seconds on a server-requested Retry-After delay
+MAX_RETRY_AFTER = 60
+
+# Phrases that mark a prompt as asking for sequence generation
+GENERATION_INDICATORS = (
+    'generate', 'create', 'make', 'new sequence', 'test sequence',
+    'spring test', 'compression test', 'tension test',
+    'free length', 'wire diameter', 'outer diameter', 'spring rate'
+)
+# One case-insensitive pass over the prompt instead of lower() plus a scan per phrase
+_GENERATION_RE = re.compile("|".join(map(re.escape, GENERATION_INDICATORS)), re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1)
+def _system_message_json() -> bytes:
+    """Get the JSON-encoded system message.
+    
+    The system prompt never changes, so it is read and encoded once, on the
+    first request.
+    
+    Returns:
+        JSON encoding of the system message.
+    """
+    return orjson.dumps({"role": "system", "content": load_prompt("system_prompt")})
+
+
+def encode_payload(model: str, user_prompt: str, temperature: float) -> bytes:
+    """Encode a chat completion request body.
+    
+    Only the per-request values are serialized; the pre-encoded system
+    message is spliced in as is.
+    
+    Args:
+        model: The model to use for generation.
+        user_prompt: The user message.
+        temperature: The temperature to use for generation.
+        
+    Returns:
+        JSON request body.
+    """
+    return b"".join((
+        b'{"model":', orjson.dumps(model),
+        b',"messages":[', _system_message_json(),
+        b',{"role":"user","content":', orjson.dumps(user_prompt),
+        b'}],"temperature":', orjson.dumps(temperature),
+        b'}'
+    ))
+
+
+def retry_after(response, default: float) -> float:
+    """Get the delay requested by a server's Retry-After header.
+    
+    Args:
+        response: The HTTP response.
+        default: Delay to use when the header is missing or not in seconds.
+        
+    Returns:
+        Delay in seconds, at most MAX_RETRY_AFTER.
+    """
+    try:
+        delay = float(response.headers.get("Retry-After", default))
+    except ValueError:
+        # HTTP-date form; not worth parsing for a short retry loop
+        delay = default
+    return min(max(delay, 0), MAX_RETRY_AFTER)
+
+
+def sequence_columns(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Collect sequence rows into one list per required column.
+    
+    Alternative column names (e.g. "Cmd", "Speed") are accepted and missing
+    values become empty strings, so the result can be turned into a
+    DataFrame in a single step.
+    
+    Args:
+        rows: Sequence rows as dictionaries.
+        
+    Returns:
+        Dictionary mapping each column in SEQUENCE_COLUMNS to its values.
+    """
+    columns = {}
+    for col in SEQUENCE_COLUMNS:
+        alias = SEQUENCE_COLUMN_ALIASES.get(col)
+        if alias is None:
+            columns[col] = [row.get(col, "") for row in rows]
+        else:
+            columns[col] = [row[col] if col in row else row.get(alias, "") for row in rows]
+    return columns
+
 
 class APIClientWorker(QObject):
     """Worker class for making API requests in a separate thread."""
     
     # Define signals
     finished = pyqtSignal(object, str)  # (DataFrame, error_message)
-    progress = pyqtSignal(int)  # Progress percentage (0-100)
-    status = pyqtSignal(str)    # Status message
     
     def __init__(self, api_client, parameters, model, temperature, max_retries):
         """Initialize the worker.
@@ -38,20 +145,40 @@ class APIClientWorker(QObject):
         self.temperature = temperature
         self.max_retries = max_retries
         self.is_cancelled = False
+        # Latest progress (0-100) and status message; polled from the GUI thread
+        # instead of emitting a cross-thread signal for every update
+        self.pending_progress = None
+        self.pending_status = None
     
     def cancel(self):
         """Cancel the current operation."""
         self.is_cancelled = True
     
+    @pyqtSlot()
     def run(self):
-        """Run the API request in a separate thread."""
+        """Run the API request in a separate thread.
+        
+        Any error is reported through finished: an exception escaping a Qt
+        slot would abort the whole application.
+        """
+        try:
+            self._run()
+        except Exception as e:
+            import pandas as pd
+            self.finished.emit(pd.DataFrame(), f"Unexpected error: {str(e)}")
+    
+    def _run(self):
+        """Make the API request and emit finished with the result."""
+        import httpx
+        import pandas as pd
+        
         # Format parameter text for prompt
         parameter_text = format_parameter_text(self.parameters)
         
         # Include previous context if available
         context = ""
         if self.api_client.chat_memory:
-            context = "\n\nPrevious context:\n" + "\n".join(self.api_client.chat_memory[-3:])
+            context = "\n\nPrevious context:\n" + "\n".join(list(self.api_client.chat_memory)[-3:])
         
         # Check if test_type is provided in parameters
         test_type_text = ""
@@ -62,30 +189,17 @@ class APIClientWorker(QObject):
         original_prompt = self.parameters.get('prompt', '')
         
         # Check if the user is actually asking for a sequence generation
-        generation_indicators = [
-            'generate', 'create', 'make', 'new sequence', 'test sequence',
-            'spring test', 'compression test', 'tension test',
-            'free length', 'wire diameter', 'outer diameter', 'spring rate'
-        ]
-        
-        is_generation_request = any(indicator in original_prompt.lower() for indicator in generation_indicators)
+        is_generation_request = _GENERATION_RE.search(original_prompt) is not None
         self.is_generation_request = is_generation_request  # Store for later use
         
         # Create user prompt with parameters
-        user_prompt = USER_PROMPT_TEMPLATE.format(
+        user_prompt = load_prompt("user_prompt").format(
             parameter_text=parameter_text if is_generation_request else "",
             test_type_text=test_type_text if is_generation_request else "My message: " + original_prompt
         ) + context
         
         # Create payload
-        payload = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT_TEMPLATE},
-                {"role": "user", "content": user_prompt}
-            ],
-            "temperature": self.temperature
-        }
+        payload = encode_payload(self.model, user_prompt, self.temperature)
         
         # Save the request for debugging
         self.api_client.request_history.append({
@@ -97,8 +211,8 @@ class APIClientWorker(QObject):
         response_text = ""
         error_message = ""
         
-        self.status.emit("Preparing request...")
-        self.progress.emit(10)
+        self.pending_status = "Preparing request..."
+        self.pending_progress = 10
         
         for attempt in range(self.max_retries):
             if self.is_cancelled:
@@ -106,48 +220,53 @@ class APIClientWorker(QObject):
                 return
                 
             try:
-                self.status.emit(f"Sending request (attempt {attempt+1}/{self.max_retries})...")
-                self.progress.emit(20 + (attempt * 15))
+                self.pending_status = f"Sending request (attempt {attempt+1}/{self.max_retries})..."
+                self.pending_progress = 20 + (attempt * 15)
                 
                 response = self.api_client.session.post(
                     API_ENDPOINT,
                     headers=self.api_client.get_headers(),
-                    json=payload,
+                    content=payload,
                     timeout=60  # 60 second timeout
                 )
                 response.raise_for_status()
-                response_json = response.json()
+                # orjson parses the raw body directly, skipping the text decode
+                response_json = orjson.loads(response.content)
                 
-                self.status.emit("Processing response...")
-                self.progress.emit(70)
+                self.pending_status = "Processing response..."
+                self.pending_progress = 70
                 
                 message = response_json['choices'][0].get('message', {})
                 response_text = message.get('content', '')
                 
                 # Save context for continuity
-                self.api_client.chat_memory.append(parameter_text)
-                if len(self.api_client.chat_memory) > 10:  # Keep memory limited
-                    self.api_client.chat_memory = self.api_client.chat_memory[-10:]
+                self.api_client.chat_memory.append(parameter_text)  # Oldest entries drop off automatically
                 
                 # Save raw response for debugging
                 self.api_client.last_raw_response = response_text
                 
                 break  # Success, exit retry loop
                 
-            except requests.exceptions.RequestException as e:
+            except httpx.HTTPError as e:
                 error_message = f"Request error: {str(e)}"
-                self.status.emit(f"Request error: {str(e)}")
+                self.pending_status = f"Request error: {str(e)}"
+                status_code = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                # Bad requests, auth failures etc. will fail the same way again
+                if status_code is not None and 400 <= status_code < 500 and status_code not in RETRIABLE_CLIENT_ERRORS:
+                    break
                 # Exponential backoff
                 if attempt < self.max_retries - 1 and not self.is_cancelled:  # Don't sleep after the last attempt
                     backoff_time = 2 ** attempt  # 1, 2, 4 seconds
-                    self.status.emit(f"Retrying in {backoff_time} seconds...")
+                    if status_code == 429:
+                        backoff_time = retry_after(e.response, backoff_time)
+                    self.pending_status = f"Retrying in {backoff_time} seconds..."
                     time.sleep(backoff_time)
             except (KeyError, ValueError, json.JSONDecodeError) as e:
                 error_message = f"Response parsing error: {str(e)}"
-                self.status.emit(f"Response parsing error: {str(e)}")
+                self.pending_status = f"Response parsing error: {str(e)}"
                 break  # Don't retry on parsing errors
         
-        self.progress.emit(80)
+        self.pending_progress = 80
         
         # If we have a response, try to parse it
         df = pd.DataFrame()
@@ -158,32 +277,13 @@ class APIClientWorker(QObject):
                 data = extract_command_sequence(response_text)
                 
                 if data:
-                    self.status.emit("Creating result table...")
-                    self.progress.emit(90)
+                    self.pending_status = "Creating result table..."
+                    self.pending_progress = 90
                     
                     # Convert to DataFrame
-                    df = pd.DataFrame(data)
-                    
-                    # Ensure all required columns are present
-                    required_columns = ["Row", "CMD", "Description", "Condition", "Unit", "Tolerance", "Speed rpm"]
-                    
-                    # Fix column names - handle both "Cmd" and "CMD" variations
-                    if "Cmd" in df.columns and "CMD" not in df.columns:
-                        df = df.rename(columns={"Cmd": "CMD"})
-                    
-                    # Rename any mismatched columns
-                    if "Speed" in df.columns and "Speed rpm" not in df.columns:
-                        df = df.rename(columns={"Speed": "Speed rpm"})
-                        
-                    # Add any missing columns
-                    for col in required_columns:
-                        if col not in df.columns:
-                            df[col] = ""
-                    
-                    # Reorder columns to match required format
-                    df = df[required_columns]
+                    df = pd.DataFrame(sequence_columns(data), columns=SEQUENCE_COLUMNS)
         
-        self.progress.emit(100)
+        self.pending_progress = 100
         
         # Handle the result differently based on whether this was a sequence request
         if self.is_generation_request:
@@ -204,19 +304,28 @@ class APIClientWorker(QObject):
 class APIClient:
     """Client for making API requests to generate test sequences."""
     
+    __slots__ = (
+        'api_key', '_headers', 'last_raw_response', 'chat_memory', 'request_history',
+        '_session', '_session_lock', 'current_worker', 'current_thread', '_running'
+    )
+    
     def __init__(self, api_key: str = ""):
         """Initialize the API client.
         
         Args:
             api_key: The API key to use for requests.
         """
-        self.api_key = api_key
+        self.set_api_key(api_key)
         self.last_raw_response = ""
-        self.chat_memory = []
-        self.request_history = []
-        self.session = requests.Session()
+        # Bounded and in memory only: context belongs to this session's chat, and
+        # request payloads are not written to disk unencrypted
+        self.chat_memory = collections.deque(maxlen=CHAT_MEMORY_SIZE)
+        self.request_history = collections.deque(maxlen=REQUEST_HISTORY_SIZE)
+        self._session = None
+        self._session_lock = threading.Lock()
         self.current_worker = None
         self.current_thread = None
+        self._running = {}  # QThread -> (worker, timer), kept alive until the thread has finished
     
     def set_api_key(self, api_key: str) -> None:
         """Set the API key.
@@ -225,25 +334,46 @@ class APIClient:
             api_key: The API key to use for requests.
         """
         self.api_key = api_key
+        # Headers only depend on the key, so build them once per key
+        self._headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    @property
+    def session(self):
+        """HTTP client shared by all requests, created on first use.
+        
+        Returns:
+            The httpx client.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import httpx
+                    # HTTP/2 client with a shared connection pool, so retries and later
+                    # requests reuse the open TLS connection
+                    self._session = httpx.Client(http2=True, timeout=60.0)
+        return self._session
     
     def get_headers(self) -> Dict[str, str]:
         """Get the headers for API requests.
         
+        The returned dictionary is shared between requests and must not be modified.
+        
         Returns:
             Headers dictionary.
         """
-        return {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        return self._headers
     
     def generate_sequence_async(self, parameters: Dict[str, Any], 
-                             callback: Callable[[pd.DataFrame, str], None],
+                             callback: Callable[["pd.DataFrame", str], None],
                              progress_callback: Optional[Callable[[int], None]] = None,
                              status_callback: Optional[Callable[[str], None]] = None,
                              model: str = DEFAULT_MODEL, 
                              temperature: float = DEFAULT_TEMPERATURE,
-                             max_retries: int = 3) -> None:
+                             max_retries: int = 3,
+                             connection: Qt.ConnectionType = Qt.AutoConnection) -> None:
         """Generate a test sequence based on parameters asynchronously.
         
         Args:
@@ -254,6 +384,8 @@ class APIClient:
             model: The model to use for generation.
             temperature: The temperature to use for generation.
             max_retries: Maximum number of retry attempts.
+            connection: How the result is delivered to the callback. Use
+                Qt.DirectConnection to call it on the worker thread.
         """
         # Cancel any existing operation
         self.cancel_current_operation()
@@ -263,36 +395,98 @@ class APIClient:
             self, parameters, model, temperature, max_retries
         )
         
-        # Connect signals
-        self.current_worker.finished.connect(callback)
-        if progress_callback:
-            self.current_worker.progress.connect(progress_callback)
-        if status_callback:
-            self.current_worker.status.connect(status_callback)
+        # Forward progress/status from a GUI-side timer; connected before the
+        # callback so the final update is delivered ahead of the result
+        timer = self._start_progress_timer(self.current_worker, progress_callback, status_callback)
         
-        # Create a thread for the worker
-        self.current_thread = threading.Thread(target=self.current_worker.run)
-        self.current_thread.daemon = True
+        # Connect signals; the worker emits from its own thread, so by default the result is queued
+        self.current_worker.finished.connect(callback, connection)
+        
+        # Move the worker to its own QThread so its signals are delivered through Qt's queues
+        thread = QThread()
+        self.current_worker.moveToThread(thread)
+        thread.started.connect(self.current_worker.run)
+        self.current_worker.finished.connect(thread.quit)
+        thread.finished.connect(lambda: self._release_thread(thread))
+        self._running[thread] = (self.current_worker, timer)
+        self.current_thread = thread
         
         # Start the thread
-        self.current_thread.start()
+        thread.start()
+    
+    def _start_progress_timer(self, worker: APIClientWorker,
+                              progress_callback: Optional[Callable[[int], None]],
+                              status_callback: Optional[Callable[[str], None]]) -> Optional[QTimer]:
+        """Start a timer that forwards the worker's latest progress and status.
+        
+        Updates made between ticks are coalesced, so the GUI sees at most one
+        progress and one status update per PROGRESS_FLUSH_INTERVAL. A value is
+        forwarded once and not repeated, so callbacks must not drop it.
+        
+        Args:
+            worker: The worker to poll.
+            progress_callback: Optional function to call with progress updates.
+            status_callback: Optional function to call with status messages.
+            
+        Returns:
+            The running timer, or None if there is nothing to forward.
+        """
+        if not progress_callback and not status_callback:
+            return None
+        
+        last = [None, None]  # Last forwarded (progress, status)
+        
+        def flush(*args):
+            progress = worker.pending_progress
+            status = worker.pending_status
+            if status_callback and status is not None and status != last[1]:
+                last[1] = status
+                status_callback(status)
+            if progress_callback and progress is not None and progress != last[0]:
+                last[0] = progress
+                progress_callback(progress)
+        
+        timer = QTimer()
+        timer.setInterval(PROGRESS_FLUSH_INTERVAL)
+        timer.timeout.connect(flush)
+        worker.finished.connect(flush)
+        worker.finished.connect(timer.stop)
+        timer.start()
+        return timer
+    
+    def _release_thread(self, thread: QThread) -> None:
+        """Drop the references to a finished worker thread.
+        
+        Args:
+            thread: The thread that has finished.
+        """
+        # The synchronous path may already have released it
+        if thread not in self._running:
+            return
+        # finished is emitted just before the thread exits, so wait for it to be fully done
+        thread.wait()
+        worker, timer = self._running.pop(thread)
+        if timer is not None:
+            timer.stop()
+            timer.deleteLater()
+        if worker is not None:
+            worker.deleteLater()
+        thread.deleteLater()
     
     def cancel_current_operation(self) -> None:
         """Cancel the current operation."""
         if self.current_worker:
             self.current_worker.cancel()
         
-        if self.current_thread and self.current_thread.is_alive():
-            # Just let it finish on its own, since we've cancelled the worker
-            pass
-        
+        # A cancelled worker finishes on its own; _running keeps it alive until then
         self.current_worker = None
         self.current_thread = None
     
     def generate_sequence(self, parameters: Dict[str, Any], 
                          model: str = DEFAULT_MODEL, 
                          temperature: float = DEFAULT_TEMPERATURE,
-                         max_retries: int = 3) -> Tuple[pd.DataFrame, str]:
+                         max_retries: int = 3,
+                         timeout: Optional[float] = None) -> Tuple["pd.DataFrame", str]:
         """Generate a test sequence based on parameters (synchronous version).
         
         Note: This method is kept for backward compatibility but should be avoided
@@ -303,27 +497,45 @@ class APIClient:
             model: The model to use for generation.
             temperature: The temperature to use for generation.
             max_retries: Maximum number of retry attempts.
+            timeout: Seconds to wait for the result, or None to wait indefinitely.
             
         Returns:
             Tuple of (DataFrame of the sequence, raw response text)
         """
-        result = [None, None]  # To store result from callback
-        event = threading.Event()
+        # Threads abandoned by earlier timed-out calls are released once they have
+        # stopped, even when no event loop delivers their finished signal
+        for finished_thread in [t for t in self._running if t.isFinished()]:
+            self._release_thread(finished_thread)
+        
+        future = concurrent.futures.Future()
         
         def callback(df, error_msg):
-            result[0] = df
-            result[1] = error_msg
-            event.set()
+            future.set_result((df, error_msg))
         
-        # Start async operation
+        # Start async operation; the result is set directly from the worker thread,
+        # so no event loop has to run while we wait
         self.generate_sequence_async(
-            parameters, callback, None, None, model, temperature, max_retries
+            parameters, callback, None, None, model, temperature, max_retries,
+            Qt.DirectConnection
         )
+        worker, thread = self.current_worker, self.current_thread
+        # The queued quit needs the caller's event loop, which may not be running
+        worker.finished.connect(thread.quit, Qt.DirectConnection)
         
-        # Wait for completion
-        event.wait()
-        
-        return result[0], result[1]
+        try:
+            result = future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            import pandas as pd
+            # Don't wait for the request in flight; the cancelled worker stops after
+            # its current attempt and stays in _running until it is released
+            self.cancel_current_operation()
+            return pd.DataFrame(), "Operation timed out"
+        
+        # The worker has finished, so this returns as soon as its thread exits.
+        # Release it here rather than from its queued finished signal.
+        thread.wait()
+        self._release_thread(thread)
+        return result
     
     def validate_api_key(self) -> Tuple[bool, str]:
         """Validate the API key with a simple request.
@@ -334,6 +546,8 @@ class APIClient:
         if not self.api_key:
             return False, "API key is empty"
         
+        import httpx
+        
         try:
             # Simple test payload that should return quickly
             payload = {
@@ -361,7 +575,7 @@ class APIClient:
             else:
                 return False, f"API error: {response.status_code}"
                 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             return False, f"Connection error: {str(e)}"
         except Exception as e:
             return False, f"Unexpected error: {str(e)}" 
\ No newline at end of file
@@ -3,40 +3,161 @@ Text parser module for the Spring Test App.
 Contains functions for extracting spring parameters from natural language text.
 """
 import re
+import json
+import time
+import orjson
+from functools import lru_cache
 from typing import Dict, Any
-from datetime import datetime
 from utils.constants import PARAMETER_PATTERNS, COMMANDS
 
+# Parameters kept as strings rather than converted to float
+STRING_PARAMETERS = frozenset(("Part Number", "Model Number", "Customer ID"))
+
+# Test type keywords
+_COMPRESSION_PATTERN = r'\b(?:compress|compression|comp|compressive|pushing|push|pressing|press)\b'
+_TENSION_PATTERN = r'\b(?:tens|tension|extension|extend|tensile|extending|pulling|pull|stretching|stretch)\b'
+
+# All patterns fused into one alternation so the text is scanned once. Each
+# alternative sits in a lookahead, so overlapping fields (e.g. a greedy Customer ID)
+# still match independently, exactly as separate searches would.
+_GROUP_NAMES = {name: name.replace(" ", "_") for name in PARAMETER_PATTERNS}
+_PARAMETER_SCAN = re.compile(
+    "|".join(
+        "(?=" + re.sub(r'\((?!\?)', f"(?P<{_GROUP_NAMES[name]}>", pattern, count=1) + ")"
+        for name, pattern in PARAMETER_PATTERNS.items()
+    )
+    + f"|(?=(?P<Compression>{_COMPRESSION_PATTERN}))"
+    + f"|(?=(?P<Tension>{_TENSION_PATTERN}))",
+    re.IGNORECASE
+)
+
+# (name, group, keep as string) for each parameter, in pattern order
+_PARAMETER_FIELDS = tuple(
+    (name, group, name in STRING_PARAMETERS) for name, group in _GROUP_NAMES.items()
+)
+
+# Lower-case substrings that every match of _PARAMETER_SCAN starts with. Text
+# containing none of them cannot match, so the scan can be skipped.
+_SCAN_KEYWORDS = (
+    "free", "part", "model", "wire", "outer", "outside", "inner", "inside",
+    "spring", "target", "test", "deflection", "working", "customer",
+    "comp", "push", "press", "tens", "exten", "pull", "stretch"
+)
+
+# Common error patterns, most specific first, fused into one scan. As above, each
+# alternative is a lookahead so a match of one cannot hide another.
+_ERROR_PATTERNS = (
+    r'error["\']?\s*:\s*["\']([^"\']+)["\']',  # "error": "message"
+    r'message["\']?\s*:\s*["\']([^"\']+)["\']',  # "message": "error message"
+    r'ERROR:\s*(.+?)(?:\n|$)',  # ERROR: message
+    r'Exception:\s*(.+?)(?:\n|$)',  # Exception: message
+)
+_ERROR_SCAN = re.compile(
+    "|".join(
+        "(?=" + re.sub(r'\((?!\?)', f"(?P<e{priority}>", pattern, count=1) + ")"
+        for priority, pattern in enumerate(_ERROR_PATTERNS)
+    ),
+    re.IGNORECASE
+)
+
+# Command codes keyed by description, plus one alternation over all descriptions
+# for rows whose description merely contains one. No description is a substring
+# of another, so at most one alternative can match at any position.
+_DESC_TO_CMD = {desc: code for code, desc in COMMANDS.items()}
+_DESC_ORDER = {desc: order for order, desc in enumerate(COMMANDS.values())}
+_DESC_RE = re.compile("(?=(" + "|".join(map(re.escape, COMMANDS.values())) + "))")
+
+# Display unit per parameter name, filled in as names are first seen
+_PARAMETER_UNITS: Dict[str, str] = {}
+
+# Last formatted timestamp as (epoch second, text); timestamps have 1 s resolution
+_timestamp_cache = (0, "")
+
+# Shared decoder for pulling the JSON payload out of model replies
+_JSON_DECODER = json.JSONDecoder()
+
 
 def extract_parameters(text: str) -> Dict[str, Any]:
     """
     Extract spring parameters from natural language text.
     
+    Repeated calls with the same text reuse the cached parse; each call gets a
+    fresh dictionary with the current timestamp.
+    
     Args:
         text: The natural language text to extract parameters from.
         
     Returns:
         A dictionary of extracted parameters.
     """
+    parameters = dict(_extract_parameters_cached(text))
+    
+    # Add timestamp to parameters
+    parameters["Timestamp"] = _timestamp()
+    
+    return parameters
+
+
+def _timestamp() -> str:
+    """
+    Get the current local time as text, formatting it at most once per second.
+    
+    Returns:
+        Timestamp in "%Y-%m-%d %H:%M:%S" format.
+    """
+    global _timestamp_cache
+    now = int(time.time())
+    cached = _timestamp_cache
+    if cached[0] != now:
+        cached = (now, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)))
+        _timestamp_cache = cached
+    return cached[1]
+
+
+@lru_cache(maxsize=256)
+def _extract_parameters_cached(text: str) -> tuple:
+    """
+    Extract spring parameters from text, memoized on the text.
+    
+    Args:
+        text: The natural language text to extract parameters from.
+        
+    Returns:
+        Tuple of (name, value) pairs, without a timestamp.
+    """
+    # Most chat turns mention no parameter at all; a few substring checks rule
+    # that out far faster than the regex scan. Non-ASCII text always gets the
+    # full scan, since IGNORECASE folds a few non-ASCII letters to ASCII ones.
+    if text.isascii():
+        lowered = text.lower()
+        if not any(keyword in lowered for keyword in _SCAN_KEYWORDS):
+            return ()
+    
     parameters = {}
+    found = {}
+    test_types = set()
     
-    # Extract test type with more flexible pattern matching
-    compression_pattern = r'\b(?:compress|compression|comp|compressive|pushing|push|pressing|press)\b'
-    tension_pattern = r'\b(?:tens|tension|extension|extend|tensile|extending|pulling|pull|stretching|stretch)\b'
+    # Single pass over the text; the first match of each parameter wins
+    for match in _PARAMETER_SCAN.finditer(text):
+        group = match.lastgroup
+        if group in ("Compression", "Tension"):
+            test_types.add(group)
+        elif group not in found:
+            found[group] = match.group(group)
     
-    if re.search(compression_pattern, text, re.IGNORECASE):
+    # Extract test type; compression wins if both are mentioned
+    if "Compression" in test_types:
         parameters["Test Type"] = "Compression"
-    elif re.search(tension_pattern, text, re.IGNORECASE):
+    elif "Tension" in test_types:
         parameters["Test Type"] = "Tension"
     # Note: We no longer set a default test type to allow the AI to decide
     
-    # Extract parameters based on patterns
-    for param, pattern in PARAMETER_PATTERNS.items():
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            value = match.group(1).strip()
+    # Keep parameters in pattern order
+    for param, group, is_string in _PARAMETER_FIELDS:
+        if group in found:
+            value = found[group].strip()
             # Convert to float if it's a numeric value
-            if param not in ["Part Number", "Model Number", "Customer ID"]:
+            if not is_string:
                 try:
                     parameters[param] = float(value)
                 except ValueError:
@@ -44,10 +165,7 @@ def extract_parameters(text: str) -> Dict[str, Any]:
             else:
                 parameters[param] = value
     
-    # Add timestamp to parameters
-    parameters["Timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    return parameters
+    return tuple(parameters.items())
 
 
 def extract_command_sequence(text: str) -> Dict[str, Any]:
@@ -60,60 +178,86 @@ def extract_command_sequence(text: str) -> Dict[str, Any]:
     Returns:
         A dictionary representation of the command sequence.
     """
-    import json
-    
-    # Try to extract JSON from the response
-    json_match = re.search(r'```json\n(.*?)\n```|(\[.*\])', text, re.DOTALL)
-    if json_match:
-        json_content = json_match.group(1) or json_match.group(2)
-    else:
-        json_content = text
-    
-    # Clean up any remaining markdown or text
-    json_content = re.sub(r'^```.*|```$', '', json_content, flags=re.MULTILINE).strip()
-    
-    # Try to parse the JSON
-    try:
-        data = json.loads(json_content)
-        
+    data = _find_row_array(text)
+    if data is not None:
         # Post-process to ensure command codes are present
         for row in data:
             # Handle case where Cmd/CMD is empty but Description exists
             if ('Cmd' in row and not row['Cmd']) or ('CMD' in row and not row['CMD']):
                 cmd_key = 'Cmd' if 'Cmd' in row else 'CMD'
                 # Try to find the command code from the description
-                description = row.get('Description', '')
-                for cmd_code, cmd_desc in COMMANDS.items():
-                    # Check if command description matches or is contained in the row description
-                    if cmd_desc == description or cmd_desc in description:
-                        row[cmd_key] = cmd_code
-                        break
+                cmd_code = _command_for_description(row.get('Description', ''))
+                if cmd_code is not None:
+                    row[cmd_key] = cmd_code
         
         return data
-    except json.JSONDecodeError:
-        # If JSON parsing fails, try to extract just the array part
-        array_match = re.search(r'\[(.*)\]', json_content, re.DOTALL)
-        if array_match:
-            cleaned_json = '[' + array_match.group(1) + ']'
-            try:
-                data = json.loads(cleaned_json)
-                # Apply the same post-processing
-                for row in data:
-                    if ('Cmd' in row and not row['Cmd']) or ('CMD' in row and not row['CMD']):
-                        cmd_key = 'Cmd' if 'Cmd' in row else 'CMD'
-                        description = row.get('Description', '')
-                        for cmd_code, cmd_desc in COMMANDS.items():
-                            if cmd_desc == description or cmd_desc in description:
-                                row[cmd_key] = cmd_code
-                                break
-                return data
-            except json.JSONDecodeError:
-                pass
     
     # If all parsing attempts fail, return an empty list
     return []
 
 
+def _command_for_description(description: str):
+    """
+    Find the command code whose description matches or is contained in a description.
+    
+    Args:
+        description: The row description.
+        
+    Returns:
+        The command code, or None if no command description was found.
+    """
+    cmd_code = _DESC_TO_CMD.get(description)
+    if cmd_code is not None:
+        return cmd_code
+    # Several descriptions may appear; the one listed first in COMMANDS wins
+    found = [match.group(1) for match in _DESC_RE.finditer(description)]
+    if not found:
+        return None
+    return _DESC_TO_CMD[min(found, key=_DESC_ORDER.__getitem__)]
+
+
+def _find_row_array(text: str):
+    """
+    Find the first JSON array of row objects in text.
+    
+    A ```json fenced block is searched first, then the whole text. The usual
+    reply, a single array up to the closing fence, is parsed with orjson in
+    one call. Otherwise the JSON is decoded in place from each opening
+    bracket, so surrounding prose and code fences are skipped without any
+    regex scans.
+    
+    Args:
+        text: The text to search.
+        
+    Returns:
+        The list of rows, or None if no array of objects was found.
+    """
+    _, fence, fenced = text.partition("```json")
+    for candidate in ((fenced, text) if fence else (text,)):
+        start = candidate.find('[')
+        if start == -1:
+            continue
+        fence_end = candidate.find("```", start)
+        end = candidate.rfind(']', start, fence_end if fence_end != -1 else len(candidate))
+        try:
+            data = orjson.loads(candidate[start:end + 1])
+        except orjson.JSONDecodeError:
+            pass
+        else:
+            if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+                return data
+        while start != -1:
+            try:
+                data, _ = _JSON_DECODER.raw_decode(candidate, start)
+            except json.JSONDecodeError:
+                pass
+            else:
+                if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+                    return data
+            start = candidate.find('[', start + 1)
+    return None
+
+
 def format_parameter_text(parameters: Dict[str, Any]) -> str:
     """
     Format parameters for display or for use in API prompts.
@@ -143,12 +287,10 @@ def format_parameter_text(parameters: Dict[str, Any]) -> str:
                 formatted_value = f"{value:.1f}"
                 
             # Add units based on parameter type
-            if "Length" in key or "Diameter" in key:
-                formatted_value += " mm"
-            elif "Force" in key or "Load" in key:
-                formatted_value += " N"
-            elif "Rate" in key:
-                formatted_value += " N/mm"
+            unit = _PARAMETER_UNITS.get(key)
+            if unit is None:
+                unit = _PARAMETER_UNITS[key] = _parameter_unit(key)
+            formatted_value += unit
         else:
             formatted_value = str(value)
             
@@ -157,6 +299,25 @@ def format_parameter_text(parameters: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
+def _parameter_unit(key: str) -> str:
+    """
+    Get the display unit for a parameter name.
+    
+    Args:
+        key: The parameter name.
+        
+    Returns:
+        Unit suffix including the leading space, or an empty string.
+    """
+    if "Length" in key or "Diameter" in key:
+        return " mm"
+    if "Force" in key or "Load" in key:
+        return " N"
+    if "Rate" in key:
+        return " N/mm"
+    return ""
+
+
 def extract_error_message(response_text: str) -> str:
     """
     Extract error message from API response.
@@ -167,17 +328,14 @@ def extract_error_message(response_text: str) -> str:
     Returns:
         Extracted error message or empty string if none found.
     """
-    # Common error patterns
-    error_patterns = [
-        r'error["\']?\s*:\s*["\']([^"\']+)["\']',  # "error": "message"
-        r'message["\']?\s*:\s*["\']([^"\']+)["\']',  # "message": "error message"
-        r'ERROR:\s*(.+?)(?:\n|$)',  # ERROR: message
-        r'Exception:\s*(.+?)(?:\n|$)',  # Exception: message
-    ]
-    
-    for pattern in error_patterns:
-        match = re.search(pattern, response_text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
+    # Single pass over the text; the first match of the most specific pattern wins
+    best = None
+    best_priority = len(_ERROR_PATTERNS)
+    for match in _ERROR_SCAN.finditer(response_text):
+        priority = int(match.lastgroup[1:])
+        if priority < best_priority:
+            best, best_priority = match.group(match.lastgroup), priority
+            if priority == 0:
+                break
     
-    return "" 
\ No newline at end of file
+    return best.strip() if best is not None else "" 
\ No newline at end of file